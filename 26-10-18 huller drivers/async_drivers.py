@@ -0,0 +1,122 @@
+# asyncio versions of the PCA9685 and INA260 drivers
+# smbus calls block, so they run on one dedicated executor thread; being
+# a single thread it also keeps bus transactions from interleaving
+# one event loop can then drive servo sweeps, buzzer patterns and current
+# sampling together, with asyncio.sleep in place of time.sleep
+
+# usage:
+#   abus = AsyncBus(smbus.SMBus(1))
+#   pwm = AsyncPCA9685(abus)
+#   ina = AsyncINA260(abus)
+#   async def main():
+#       await pwm.begin(0x7C)
+#       await pwm.set_pwm(0, 0, 300)
+#       print(await ina.read_current())
+#   asyncio.run(main())
+
+import asyncio
+from concurrent.futures import ThreadPoolExecutor
+
+from pca9685 import PCA9685, FrameBuffer, PCA9685_ADDRESS
+from ina260 import INA260, INA260_ADDRESS
+
+
+class AsyncBus(object):
+    """An smbus-style bus with a single executor thread to run it on."""
+
+    def __init__(self, bus):
+        self.bus = bus
+        self.executor = ThreadPoolExecutor(max_workers=1,
+                                           thread_name_prefix="i2c")
+
+    async def run(self, fn, *args):
+        """Run fn(*args) on the bus thread and wait for it."""
+        loop = asyncio.get_running_loop()
+        return await loop.run_in_executor(self.executor, fn, *args)
+
+    def close(self):
+        self.executor.shutdown(wait=True)
+
+
+class AsyncPCA9685(object):
+    """PCA9685 channel and frequency operations as coroutines.
+
+    The synchronous driver (self.pwm) and its shadow registers are only
+    ever touched from the bus thread.
+    """
+
+    def __init__(self, abus, address=PCA9685_ADDRESS, block_writes=True,
+                 stagger=True):
+        self._abus = abus
+        self.pwm = PCA9685(abus.bus, address, block_writes)
+        # channel setters on the frame only change memory, so they can be
+        # called straight from coroutines; flush() sends it
+        self.frame = FrameBuffer(self.pwm, stagger, load=False)
+
+    async def begin(self, prescale_value):
+        warm = await self._abus.run(self.pwm.begin, prescale_value)
+        await self._abus.run(self.frame.load)
+        return warm
+
+    async def reset(self, prescale_value):
+        await self._abus.run(self.pwm.reset, prescale_value)
+
+    async def set_prescale(self, prescale_value):
+        await self._abus.run(self.pwm.set_prescale, prescale_value)
+
+    async def set_pwm_freq(self, freq_hz):
+        await self._abus.run(self.pwm.set_pwm_freq, freq_hz)
+
+    async def set_pwm(self, channel, on, off):
+        await self._abus.run(self.pwm.set_pwm, channel, on, off)
+
+    async def set_all_pwm(self, on, off):
+        await self._abus.run(self.pwm.set_all_pwm, on, off)
+
+    async def flush(self):
+        """Send what changed in self.frame; returns bytes sent."""
+        # taken here on the loop thread, so coroutines can go on changing
+        # the frame while the write is out on the bus
+        span = self.frame.take_dirty()
+        if span is None:
+            return 0
+        await self._abus.run(self.pwm.write_regs, *span)
+        return len(span[1])
+
+
+class AsyncINA260(object):
+    """INA260 register reads as coroutines."""
+
+    def __init__(self, abus, address=INA260_ADDRESS):
+        self._abus = abus
+        self.address = address
+        self.ina = INA260(abus.bus, address)
+
+    # through the INA260 driver, on the bus thread, so it keeps track of
+    # the register pointer for its fast reads
+    async def read_unsigned_16bit(self, register):
+        return await self._abus.run(self.ina.read_register, register)
+
+    async def read_signed_16bit(self, register):
+        v = await self.read_unsigned_16bit(register)
+        if v > 32767:
+            v -= 65536
+        return v
+
+    async def read_current(self):
+        """Raw signed current, 1.25 mA per bit."""
+        return await self._abus.run(self.ina.read_current)
+
+    async def read_bus_voltage(self):
+        """Raw bus voltage, 1.25 mV per bit."""
+        return await self._abus.run(self.ina.read_bus_voltage)
+
+    async def read_power(self):
+        """Raw power, 10 mW per bit."""
+        return await self._abus.run(self.ina.read_power)
+
+    async def mfr_id(self):
+        return await self._abus.run(self.ina.mfr_id)
+
+    async def die_id(self):
+        return await self._abus.run(self.ina.die_id)
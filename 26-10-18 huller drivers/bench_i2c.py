@@ -0,0 +1,280 @@
+# I2C cost of the operations the huller scripts actually do:
+# a servo step in the seed-lift sweep, a buzzer reverse in the
+# "manual control" scripts, and an INA260 current read as in the
+# servo_current.py polling loop, each the old way and through the
+# drivers in this folder
+
+# for each operation reports transactions, bytes on the wire, modelled
+# bus time at 100 and 400 kHz, and the Python-side time per operation
+
+# run:
+#   python3 bench_i2c.py                  # against the fake bus
+#   python3 bench_i2c.py --json out.json  # also save the results
+#   python3 bench_i2c.py --real           # smbus.SMBus(1), on the Pi
+# results files can be compared run to run to catch regressions
+
+import argparse, json, sys, time
+
+from pca9685 import (PCA9685, FrameBuffer, PCA9685_ADDRESS, CHAN_BASE_ADDR_ON_L,
+                     CHAN_BASE_ADDR_ON_H, CHAN_BASE_ADDR_OFF_L,
+                     CHAN_BASE_ADDR_OFF_H, CHAN_FULL)
+from ina260 import INA260, INA260_ADDRESS, CURRENT_REG, read_signed_16bit
+from fake_smbus import FakeSMBus, FakePCA9685, FakeINA260
+
+PRESCALE_50HZ = 0x7C
+CLOCKWISE_LIMIT = 103 # HXT900
+COUNTERCLOCKWISE_LIMIT = 483
+BUZZER_CHANNELS = {"en": 1, "in1": 2, "in2": 3}
+
+
+class CountingBus(object):
+    """Wraps any smbus-style bus and counts what goes over the wire,
+    with the same accounting as FakeSMBus, so real-hardware runs can be
+    compared with simulated ones. busy is the wall time spent inside
+    bus calls.
+    """
+
+    def __init__(self, bus):
+        self._bus = bus
+        self.transactions = 0
+        self.wire_bytes = 0
+        self.busy = 0.0
+        # only offered if the wrapped bus has it, python-smbus doesn't,
+        # so drivers checking for it fall back to plain smbus calls
+        if hasattr(bus, "i2c_rdwr"):
+            self.i2c_rdwr = self._i2c_rdwr
+
+    def _call(self, written, read, method, *args):
+        self.transactions += 1
+        self.wire_bytes += 1 + written + ((1 if written else 0) + read if read else 0)
+        start = time.perf_counter()
+        try:
+            return getattr(self._bus, method)(*args)
+        finally:
+            self.busy += time.perf_counter() - start
+
+    def bus_time(self, clock_hz=100000):
+        return (9 * self.wire_bytes + 2 * self.transactions) / clock_hz
+
+    def write_byte_data(self, addr, register, value):
+        return self._call(2, 0, "write_byte_data", addr, register, value)
+
+    def read_byte_data(self, addr, register):
+        return self._call(1, 1, "read_byte_data", addr, register)
+
+    def write_word_data(self, addr, register, value):
+        return self._call(3, 0, "write_word_data", addr, register, value)
+
+    def read_word_data(self, addr, register):
+        return self._call(1, 2, "read_word_data", addr, register)
+
+    def write_i2c_block_data(self, addr, register, data):
+        return self._call(1 + len(data), 0, "write_i2c_block_data",
+                          addr, register, data)
+
+    def read_i2c_block_data(self, addr, register, length=32):
+        return self._call(1, length, "read_i2c_block_data",
+                          addr, register, length)
+
+    @property
+    def i2c_msg(self):
+        # the wrapped bus's message class, if it has one
+        return getattr(self._bus, "i2c_msg", None)
+
+    def _i2c_rdwr(self, *msgs):
+        start = time.perf_counter()
+        try:
+            result = self._bus.i2c_rdwr(*msgs)
+        finally:
+            self.busy += time.perf_counter() - start
+        # one transaction per message, as FakeSMBus counts them
+        self.transactions += len(msgs)
+        self.wire_bytes += sum(1 + m.len for m in msgs)
+        return result
+
+
+def sweep_positions(n):
+    """n servo positions, up and down the HXT900 range in steps of 4."""
+    up = list(range(CLOCKWISE_LIMIT, COUNTERCLOCKWISE_LIMIT, 4))
+    cycle = up + up[::-1]
+    return [cycle[i % len(cycle)] for i in range(n)]
+
+
+# each benchmark is setup(bus) -> op(i), where op does one operation
+
+def servo_step_word(bus):
+    """07 HXT900 lift seed.py: write_word_data to LED0_OFF_L."""
+    bus.write_byte_data(PCA9685_ADDRESS, 0x00, 0x20) # MODE1.AI
+    bus.write_word_data(PCA9685_ADDRESS, CHAN_BASE_ADDR_ON_L, 0)
+    positions = sweep_positions(1024)
+    def op(i):
+        bus.write_word_data(PCA9685_ADDRESS, CHAN_BASE_ADDR_OFF_L, positions[i % 1024])
+    return op
+
+def servo_step_bytes(bus):
+    """test02.py set_pwm: four single register writes."""
+    pwm = PCA9685(bus, block_writes=False)
+    pwm.begin(PRESCALE_50HZ)
+    positions = sweep_positions(1024)
+    def op(i):
+        pwm.set_pwm(0, 0, positions[i % 1024])
+    return op
+
+def servo_step_block(bus):
+    """PCA9685.set_pwm, one 4-byte block write."""
+    pwm = PCA9685(bus)
+    pwm.begin(PRESCALE_50HZ)
+    positions = sweep_positions(1024)
+    def op(i):
+        pwm.set_pwm(0, 0, positions[i % 1024])
+    return op
+
+def servo_step_frame(bus):
+    """FrameBuffer.set_pulse and flush."""
+    pwm = PCA9685(bus)
+    pwm.begin(PRESCALE_50HZ)
+    frame = FrameBuffer(pwm)
+    positions = sweep_positions(1024)
+    def op(i):
+        frame.set_pulse(0, positions[i % 1024])
+        frame.flush()
+    return op
+
+def _legacy_buzzer_write(bus, states):
+    # loop body of "21-11-27 buzzer tests/03 manual control.py"
+    for key in sorted(BUZZER_CHANNELS):
+        chan_num = BUZZER_CHANNELS[key]
+        if not states[key]:
+            bus.write_word_data(PCA9685_ADDRESS, CHAN_BASE_ADDR_ON_H + 4 * chan_num, 0)
+            bus.write_word_data(PCA9685_ADDRESS, CHAN_BASE_ADDR_OFF_H + 4 * chan_num, CHAN_FULL)
+        else:
+            bus.write_word_data(PCA9685_ADDRESS, CHAN_BASE_ADDR_OFF_H + 4 * chan_num, 0)
+            bus.write_word_data(PCA9685_ADDRESS, CHAN_BASE_ADDR_ON_L + 4 * chan_num, 0)
+            bus.write_word_data(PCA9685_ADDRESS, CHAN_BASE_ADDR_ON_H + 4 * chan_num, CHAN_FULL)
+
+def buzzer_reverse_word(bus):
+    """03 manual control.py: '<>' then rewrite all three lines."""
+    bus.write_byte_data(PCA9685_ADDRESS, 0x00, 0x20) # MODE1.AI
+    states = {"en": 1, "in1": 1, "in2": 0}
+    def op(i):
+        states["in1"] ^= 1
+        states["in2"] ^= 1
+        _legacy_buzzer_write(bus, states)
+    return op
+
+def buzzer_reverse_frame(bus):
+    """FrameBuffer: set all three lines, flush what changed."""
+    pwm = PCA9685(bus)
+    pwm.begin(0x03)
+    frame = FrameBuffer(pwm)
+    states = {"en": 1, "in1": 1, "in2": 0}
+    def op(i):
+        states["in1"] ^= 1
+        states["in2"] ^= 1
+        for key, chan_num in BUZZER_CHANNELS.items():
+            if states[key]:
+                frame.set_full_on(chan_num)
+            else:
+                frame.set_full_off(chan_num)
+        frame.flush()
+    return op
+
+def ina260_current_read(bus):
+    """servo_current.py polling loop, without the print."""
+    def op(i):
+        read_signed_16bit(bus, INA260_ADDRESS, CURRENT_REG)
+    return op
+
+def ina260_current_fast(bus):
+    """INA260.read_current, the pointer left on CURRENT_REG."""
+    ina = INA260(bus)
+    ina.read_current() # sets the pointer
+    def op(i):
+        ina.read_current()
+    return op
+
+BENCHMARKS = [
+    ("servo_step_word", servo_step_word),
+    ("servo_step_bytes", servo_step_bytes),
+    ("servo_step_block", servo_step_block),
+    ("servo_step_frame", servo_step_frame),
+    ("buzzer_reverse_word", buzzer_reverse_word),
+    ("buzzer_reverse_frame", buzzer_reverse_frame),
+    ("ina260_current_read", ina260_current_read),
+    ("ina260_current_fast", ina260_current_fast),
+]
+
+
+def make_fake_bus(latency=0.0):
+    return FakeSMBus([FakePCA9685(PCA9685_ADDRESS), FakeINA260(INA260_ADDRESS)],
+                     latency=latency)
+
+def run_one(name, setup, bus, n):
+    """Run one benchmark for n operations; dict of per-operation costs."""
+    counted = CountingBus(bus)
+    op = setup(counted)
+    # setup traffic is not part of the operation
+    t0_trans, t0_bytes = counted.transactions, counted.wire_bytes
+    start = time.perf_counter()
+    for i in range(n):
+        op(i)
+    wall = time.perf_counter() - start
+    trans = counted.transactions - t0_trans
+    nbytes = counted.wire_bytes - t0_bytes
+    bus_100k = (9 * nbytes + 2 * trans) / 100000
+    bus_400k = (9 * nbytes + 2 * trans) / 400000
+    # on the fake bus nothing is on a wire, the whole time is Python
+    # (drivers plus the device models) and any simulated latency
+    python = wall - trans * getattr(bus, "latency", 0.0)
+    if not isinstance(bus, FakeSMBus):
+        python -= bus_100k # Raspberry Pi I2C default clock
+    return {"name": name,
+            "ops": n,
+            "transactions_per_op": trans / n,
+            "bytes_per_op": nbytes / n,
+            "bus_us_per_op_100k": 1e6 * bus_100k / n,
+            "bus_us_per_op_400k": 1e6 * bus_400k / n,
+            "wall_us_per_op": 1e6 * wall / n,
+            "python_us_per_op": 1e6 * max(0.0, python) / n}
+
+def run_all(make_bus, n=1000, names=None):
+    results = []
+    for name, setup in BENCHMARKS:
+        if names and name not in names:
+            continue
+        results.append(run_one(name, setup, make_bus(), n))
+    return results
+
+def print_table(results, out=sys.stdout):
+    print("{0:<22}{1:>8}{2:>8}{3:>11}{4:>11}{5:>11}".format(
+        "operation", "trans", "bytes", "us@100k", "us@400k", "python us"), file=out)
+    for r in results:
+        print("{0:<22}{1:>8.2f}{2:>8.1f}{3:>11.1f}{4:>11.1f}{5:>11.1f}".format(
+            r["name"], r["transactions_per_op"], r["bytes_per_op"],
+            r["bus_us_per_op_100k"], r["bus_us_per_op_400k"],
+            r["python_us_per_op"]), file=out)
+
+
+if __name__ == "__main__":
+    parser = argparse.ArgumentParser(description="I2C operation benchmarks")
+    parser.add_argument("-n", type=int, default=1000, help="operations per benchmark")
+    parser.add_argument("--real", action="store_true", help="use smbus.SMBus(1)")
+    parser.add_argument("--latency", type=float, default=0.0,
+                        help="simulated seconds per transaction, fake bus only")
+    parser.add_argument("--json", help="write results to this file")
+    parser.add_argument("names", nargs="*", help="benchmarks to run, default all")
+    args = parser.parse_args()
+
+    if args.real:
+        import smbus
+        real_bus = smbus.SMBus(1) # Create a new I2C bus
+        make_bus = lambda: real_bus
+    else:
+        make_bus = lambda: make_fake_bus(args.latency)
+    results = run_all(make_bus, args.n, args.names)
+    print_table(results)
+    if args.json:
+        with open(args.json, "w") as f:
+            json.dump({"timestamp": time.time(),
+                       "bus": "smbus" if args.real else "fake",
+                       "results": results}, f, indent=1)
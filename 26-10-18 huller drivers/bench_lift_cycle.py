@@ -0,0 +1,155 @@
+# seed-lift cycle throughput
+# the lift seed scripts loop forever with no idea how many seeds a minute
+# they lift; this runs N complete cycles, rise, dwell at the top, return,
+# timestamps each phase, and reports cycles per minute, p50/p99 cycle
+# time, and where the time went: Python, the bus, or sleeping
+
+# modes:
+#   steps   - "07 HXT900 lift seed.py": steps of 4 counts, sleep 0.05
+#   profile - S-curve strokes from the trajectory cache, one per PWM frame
+
+# run:
+#   python3 bench_lift_cycle.py -n 20 --mode profile
+#   python3 bench_lift_cycle.py --latency 0.0003   # fake bus, slowed
+#   python3 bench_lift_cycle.py --real             # smbus.SMBus(1)
+
+import argparse, json, math, time
+
+from pca9685 import PCA9685, FrameBuffer, PCA9685_ADDRESS
+from fake_smbus import FakeSMBus, FakePCA9685
+from bench_i2c import CountingBus
+from servo_models import get_model
+from trajectory_cache import TrajectoryCache, play_cached
+from motion_profile import SCURVE
+
+PRESCALE_50HZ = 0x7C
+FRAME_RATE = 50.0
+STEPS = "steps"
+PROFILE = "profile"
+PHASES = ("rise", "dwell", "return")
+
+
+class SleepMeter(object):
+    """time.sleep that adds up how long it slept."""
+
+    def __init__(self):
+        self.slept = 0.0
+
+    def __call__(self, seconds):
+        start = time.perf_counter()
+        time.sleep(seconds)
+        self.slept += time.perf_counter() - start
+
+
+def percentile(values, p):
+    """Nearest-rank percentile, p in 0-100."""
+    s = sorted(values)
+    if not s:
+        return 0.0
+    k = max(0, min(len(s) - 1, math.ceil(p / 100.0 * len(s)) - 1))
+    return s[k]
+
+
+def step_stroke(pwm, start, end, sleep, position_step=4, time_step=0.05):
+    # the loop from "07 HXT900 lift seed.py", without the prints
+    step = position_step if end > start else -position_step
+    for time_high in range(start, end, step):
+        pwm.set_pwm(0, 0, time_high)
+        sleep(time_step)
+    pwm.set_pwm(0, 0, end) # assure the limit
+    sleep(time_step)
+
+
+def run_cycles(bus, n, mode=PROFILE, dwell=0.2, model="HXT900"):
+    """Run n lift cycles; returns a list of per-cycle phase timestamps."""
+    sleep = SleepMeter()
+    counted = CountingBus(bus)
+    pwm = PCA9685(counted)
+    pwm.begin(PRESCALE_50HZ)
+    frame = FrameBuffer(pwm)
+    servo = get_model(model)
+    low, high = servo.count_limits(FRAME_RATE)
+    cache = TrajectoryCache()
+    up = cache.get(servo.name, low, high, SCURVE, FRAME_RATE)
+    down = cache.get(servo.name, high, low, SCURVE, FRAME_RATE)
+    frame.set_pulse(0, low)
+    frame.flush()
+    # setup isn't part of the cycles
+    counted.busy = 0.0
+    counted.transactions = 0
+    counted.wire_bytes = 0
+
+    cycles = []
+    start = time.perf_counter()
+    for i in range(n):
+        t = [time.perf_counter()]
+        if mode == STEPS:
+            step_stroke(pwm, low, high, sleep)
+        else:
+            play_cached(pwm, 0, up, 1.0 / FRAME_RATE, frame, sleep)
+        t.append(time.perf_counter())
+        sleep(dwell)
+        t.append(time.perf_counter())
+        if mode == STEPS:
+            step_stroke(pwm, high, low, sleep)
+        else:
+            play_cached(pwm, 0, down, 1.0 / FRAME_RATE, frame, sleep)
+        t.append(time.perf_counter())
+        cycles.append(t)
+    total = time.perf_counter() - start
+    return cycles, {"total_s": total, "bus_s": counted.busy,
+                    "sleep_s": sleep.slept,
+                    "python_s": max(0.0, total - counted.busy - sleep.slept),
+                    "transactions": counted.transactions}
+
+
+def report(cycles, split, mode):
+    times = [c[-1] - c[0] for c in cycles]
+    total = split["total_s"]
+    r = {"mode": mode,
+         "cycles": len(cycles),
+         "cycles_per_min": 60.0 * len(cycles) / total if total else 0.0,
+         "cycle_p50_ms": 1e3 * percentile(times, 50),
+         "cycle_p99_ms": 1e3 * percentile(times, 99)}
+    for i, name in enumerate(PHASES):
+        r[name + "_mean_ms"] = 1e3 * sum(c[i + 1] - c[i] for c in cycles) / len(cycles)
+    for k in ("python_s", "bus_s", "sleep_s"):
+        r[k.replace("_s", "_pct")] = 100.0 * split[k] / total if total else 0.0
+    r["transactions_per_cycle"] = split["transactions"] / len(cycles)
+    return r
+
+def print_report(r):
+    print("{0} mode, {1} cycles".format(r["mode"], r["cycles"]))
+    print("  cycles/min     {0:.1f}".format(r["cycles_per_min"]))
+    print("  cycle p50/p99  {0:.1f} / {1:.1f} ms".format(r["cycle_p50_ms"], r["cycle_p99_ms"]))
+    print("  rise/dwell/return  {0:.1f} / {1:.1f} / {2:.1f} ms".format(
+        r["rise_mean_ms"], r["dwell_mean_ms"], r["return_mean_ms"]))
+    print("  python/bus/sleep   {0:.1f} / {1:.1f} / {2:.1f} %".format(
+        r["python_pct"], r["bus_pct"], r["sleep_pct"]))
+    print("  transactions/cycle {0:.1f}".format(r["transactions_per_cycle"]))
+
+
+if __name__ == "__main__":
+    parser = argparse.ArgumentParser(description="seed-lift cycle benchmark")
+    parser.add_argument("-n", type=int, default=10, help="lift cycles")
+    parser.add_argument("--mode", choices=(STEPS, PROFILE), default=PROFILE)
+    parser.add_argument("--dwell", type=float, default=0.2, help="seconds at the top")
+    parser.add_argument("--model", default="HXT900")
+    parser.add_argument("--real", action="store_true", help="use smbus.SMBus(1)")
+    parser.add_argument("--latency", type=float, default=0.0,
+                        help="simulated seconds per transaction, fake bus only")
+    parser.add_argument("--json", help="write the report to this file")
+    args = parser.parse_args()
+
+    if args.real:
+        import smbus
+        i2c_bus = smbus.SMBus(1) # Create a new I2C bus
+    else:
+        i2c_bus = FakeSMBus([FakePCA9685(PCA9685_ADDRESS)], latency=args.latency)
+    cycles, split = run_cycles(i2c_bus, args.n, args.mode, args.dwell, args.model)
+    r = report(cycles, split, args.mode)
+    print_report(r)
+    if args.json:
+        with open(args.json, "w") as f:
+            json.dump(dict(r, timestamp=time.time(),
+                           bus="smbus" if args.real else "fake"), f, indent=1)
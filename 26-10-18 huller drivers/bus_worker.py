@@ -0,0 +1,238 @@
+# one thread owns the I2C bus and serves transactions queued by any
+# number of producers, e.g. a servo sweep and INA260 current sampling,
+# which servo_current.py could not do at the same time
+
+# usage:
+#   worker = BusWorker(smbus.SMBus(1))
+#   worker.start()
+#   pwm = PCA9685(worker.proxy(PRIORITY_HIGH, coalesce=is_channel_register))
+#   ina = INA260(worker.proxy(PRIORITY_NORMAL))
+#   ... use pwm and ina from any threads ...
+#   worker.stop()
+
+# writes through a proxy return at once, without waiting for the bus;
+# reads wait for their result. Queued transactions are served by priority,
+# lowest number first, and in submission order within a priority.
+# With coalesce set, a write to the same device and register as one still
+# waiting in the queue replaces that one's data (last write wins), so a
+# fast producer can't pile up servo positions the chip would never show.
+# With frame_period set, only writes within one frame are folded
+# together, so the chip still gets one value per frame. Any other
+# transaction to the device, or a write to registers overlapping the
+# queued one, is a barrier: a write after it is queued behind it, never
+# folded into one ahead of it.
+
+import heapq, itertools, logging, threading, time
+from concurrent.futures import Future
+
+from pca9685 import (CHAN_BASE_ADDR_ON_L, NUM_CHANNELS, ALLCALL_ADDRESS,
+                     SUBADR_DEFAULTS)
+
+logger = logging.getLogger(__name__)
+
+PRIORITY_HIGH = 0 # actuators
+PRIORITY_NORMAL = 1 # sampling
+PRIORITY_LOW = 2 # housekeeping, logging
+
+_STOP = object()
+# addresses every board, or a group of them, answers to
+_BROADCAST = frozenset([ALLCALL_ADDRESS]) | frozenset(SUBADR_DEFAULTS.values())
+
+
+def is_channel_register(addr, register):
+    """True for the PCA9685 LEDn registers, where only the last write of a
+    frame matters. MODE1/PRE_SCALE sequences must never be coalesced.
+    """
+    return CHAN_BASE_ADDR_ON_L <= register < CHAN_BASE_ADDR_ON_L + 4 * NUM_CHANNELS
+
+
+def _write_span(method, args):
+    """[first, last + 1) registers a write touches."""
+    register = args[1]
+    if method == "write_i2c_block_data":
+        return register, register + len(args[2])
+    return register, register + (2 if method == "write_word_data" else 1)
+
+
+class _Job(object):
+    __slots__ = ("method", "args", "future", "key", "span", "frame")
+
+    def __init__(self, method, args, future, key, span=None, frame=0):
+        self.method = method
+        self.args = args
+        self.future = future
+        self.key = key
+        self.span = span
+        self.frame = frame
+
+
+class BusWorker(object):
+    """Thread that owns an smbus-style bus and runs queued transactions.
+
+    frame_period, seconds, limits coalescing to writes in the same frame,
+    frames counted on time.monotonic(); None coalesces with anything
+    still queued.
+    """
+
+    def __init__(self, bus, frame_period=None):
+        self._bus = bus
+        self.frame_period = frame_period
+        self._heap = []
+        self._seq = itertools.count()
+        self._pending = {} # coalesce key -> _Job still in the queue
+        self._cond = threading.Condition()
+        self._thread = None
+        self.executed = 0
+        self.coalesced = 0
+
+    def start(self):
+        self._thread = threading.Thread(target=self._run, name="i2c bus worker",
+                                        daemon=True)
+        self._thread.start()
+        return self
+
+    def stop(self):
+        """Finish everything already queued, then end the thread."""
+        with self._cond:
+            heapq.heappush(self._heap, (PRIORITY_LOW + 1, next(self._seq), _STOP))
+            self._cond.notify()
+        if self._thread is not None:
+            self._thread.join()
+            self._thread = None
+
+    def __enter__(self):
+        return self.start()
+
+    def __exit__(self, *exc):
+        self.stop()
+
+    def submit(self, method, args, priority=PRIORITY_NORMAL, key=None):
+        """Queue bus.method(*args); returns a Future with its result.
+
+        If key is given and a job with the same key is still waiting,
+        queued in the same frame, that job takes these args instead and
+        its future is returned. Keyed jobs are writes, (addr, register,
+        ...) args, keyed starting with the address. A job without a key
+        ends coalescing into the jobs for its device already queued, or
+        for every device if it goes to ALLCALL or a group address; a keyed
+        write ends it for queued writes it overlaps.
+        """
+        with self._cond:
+            frame = self._frame()
+            span = None
+            if key is None:
+                addr = args[0] if args and isinstance(args[0], int) else None
+                if addr in _BROADCAST:
+                    addr = None # reaches every device
+                for k in [k for k in self._pending if addr is None or k[0] == addr]:
+                    del self._pending[k]
+            else:
+                job = self._pending.get(key)
+                if job is not None and job.frame == frame:
+                    job.args = args
+                    self.coalesced += 1
+                    return job.future
+                addr = args[0]
+                span = lo, hi = _write_span(method, args)
+                # writes after this one must not fold into anything it
+                # overwrites, or older data would go out after it
+                for k, j in list(self._pending.items()):
+                    if k[0] == addr and j.span[0] < hi and lo < j.span[1]:
+                        del self._pending[k]
+            job = _Job(method, args, Future(), key, span, frame)
+            if key is not None:
+                self._pending[key] = job
+            heapq.heappush(self._heap, (priority, next(self._seq), job))
+            self._cond.notify()
+            return job.future
+
+    def _frame(self):
+        if self.frame_period is None:
+            return 0
+        return int(time.monotonic() / self.frame_period)
+
+    def call(self, method, args, priority=PRIORITY_NORMAL):
+        """Queue and wait for the result, e.g. a register read."""
+        return self.submit(method, args, priority).result()
+
+    def proxy(self, priority=PRIORITY_NORMAL, coalesce=None):
+        return BusProxy(self, priority, coalesce)
+
+    def _run(self):
+        while True:
+            with self._cond:
+                while not self._heap:
+                    self._cond.wait()
+                priority, seq, job = heapq.heappop(self._heap)
+                if job is _STOP:
+                    return
+                # a barrier may already have taken it out
+                if job.key is not None and self._pending.get(job.key) is job:
+                    del self._pending[job.key]
+                # args are taken under the lock, coalescing can't race it
+                method, args = job.method, job.args
+            if not job.future.set_running_or_notify_cancel():
+                continue
+            try:
+                result = getattr(self._bus, method)(*args)
+            except Exception as e:
+                job.future.set_exception(e)
+                logger.error("i2c %s%s failed: %s", method, args, e)
+            else:
+                job.future.set_result(result)
+            self.executed += 1
+
+
+class BusProxy(object):
+    """smbus-style bus for drivers, backed by a BusWorker.
+
+    coalesce(addr, register) says which writes may be coalesced.
+    """
+
+    def __init__(self, worker, priority=PRIORITY_NORMAL, coalesce=None):
+        self._worker = worker
+        self.priority = priority
+        self._coalesce = coalesce
+        # only offered if the worker's bus has it, python-smbus doesn't,
+        # so drivers checking for it fall back to plain smbus calls
+        if hasattr(worker._bus, "i2c_rdwr"):
+            self.i2c_rdwr = self._i2c_rdwr
+
+    @property
+    def i2c_msg(self):
+        # the worker's bus's message class, if it has one
+        return getattr(self._worker._bus, "i2c_msg", None)
+
+    def _write(self, method, addr, register, *rest):
+        key = None
+        if self._coalesce is not None and self._coalesce(addr, register):
+            # block writes only replace one covering the same span
+            key = (addr, register, method, len(rest[-1]) if method ==
+                   "write_i2c_block_data" else 0)
+        return self._worker.submit(method, (addr, register) + rest,
+                                   self.priority, key)
+
+    def _read(self, method, *args):
+        return self._worker.call(method, args, self.priority)
+
+    def write_byte_data(self, addr, register, value):
+        self._write("write_byte_data", addr, register, value)
+
+    def write_word_data(self, addr, register, value):
+        self._write("write_word_data", addr, register, value)
+
+    def write_i2c_block_data(self, addr, register, data):
+        # copy, the caller may reuse its buffer
+        self._write("write_i2c_block_data", addr, register, list(data))
+
+    def read_byte_data(self, addr, register):
+        return self._read("read_byte_data", addr, register)
+
+    def read_word_data(self, addr, register):
+        return self._read("read_word_data", addr, register)
+
+    def read_i2c_block_data(self, addr, register, length=32):
+        return self._read("read_i2c_block_data", addr, register, length)
+
+    def _i2c_rdwr(self, *msgs):
+        return self._read("i2c_rdwr", *msgs)
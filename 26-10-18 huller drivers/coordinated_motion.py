@@ -0,0 +1,85 @@
+# several servos moving together off one PCA9685
+# writing each servo's channel in turn costs a transaction per servo per
+# frame, and the servos end up a write apart from each other. Here the
+# trajectories for all the channels are lined up frame by frame, each
+# frame's positions go into the FrameBuffer together, and one flush sends
+# them as a single auto-increment burst over the affected channels
+
+# usage:
+#   move = CoordinatedMove(frame, {0: up0, 1: up1, 2: down2})
+#   move.play(frame_period)
+# or, frame-synchronous:
+#   move.attach(sync) # a FrameSync; the move steps once per PWM frame
+
+import time
+
+import numpy as np
+
+PAD = "pad" # shorter moves finish early and hold their end position
+STRETCH = "stretch" # every move is resampled to finish on the same frame
+
+
+class CoordinatedMove(object):
+    """Trajectories for several channels, time-aligned frame by frame."""
+
+    def __init__(self, frame, trajectories, align=PAD):
+        if align not in (PAD, STRETCH):
+            raise ValueError("unknown alignment {0}".format(align))
+        self.frame = frame
+        self.channels = sorted(trajectories)
+        length = max(len(trajectories[c]) for c in self.channels)
+        # one row per frame, one column per channel
+        self.positions = np.empty((length, len(self.channels)), dtype=np.uint16)
+        for j, c in enumerate(self.channels):
+            p = np.asarray(trajectories[c], dtype=float)
+            if align == STRETCH and len(p) > 1:
+                p = np.interp(np.linspace(0, len(p) - 1, length),
+                              np.arange(len(p)), p)
+            else:
+                p = np.concatenate([p, np.full(length - len(p), p[-1])])
+            self.positions[:, j] = np.rint(p)
+        self.index = 0
+        self.on_done = None # called once, after the last frame is set
+
+    def __len__(self):
+        return len(self.positions)
+
+    @property
+    def done(self):
+        return self.index >= len(self.positions)
+
+    def apply(self, i):
+        """Put frame i's positions into the FrameBuffer, not yet sent."""
+        row = self.positions[i].tolist()
+        for c, p in zip(self.channels, row):
+            self.frame.set_pulse(c, p)
+
+    def step(self, *args):
+        """Set the next frame's positions; FrameSync before_flush hook."""
+        if self.done:
+            return
+        self.apply(self.index)
+        self.index += 1
+        if self.done and self.on_done is not None:
+            self.on_done(self)
+
+    def attach(self, sync):
+        """Step once per PWM frame, just before the sync's flush."""
+        self.index = 0
+        sync.before_flush.append(self.step)
+
+    def detach(self, sync):
+        if self.step in sync.before_flush:
+            sync.before_flush.remove(self.step)
+
+    def play(self, frame_period):
+        """Blocking playback, one burst per frame against deadlines."""
+        self.index = 0
+        deadline = time.monotonic()
+        while not self.done:
+            self.step()
+            self.frame.flush()
+            deadline += frame_period
+            delay = deadline - time.monotonic()
+            if delay > 0:
+                time.sleep(delay)
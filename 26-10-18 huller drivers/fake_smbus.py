@@ -0,0 +1,475 @@
+# in-process stand-in for smbus.SMBus(1), with register-level models of
+# the PCA9685 and INA260, so the drivers here can run on a laptop or in
+# CI, and bus traffic can be counted and timed without hardware
+
+# usage:
+#   from fake_smbus import FakeSMBus, FakePCA9685, FakeINA260
+#   bus = FakeSMBus([FakePCA9685(0x40), FakeINA260(0x45)])
+#   pwm = PCA9685(bus)
+#   ...
+#   print(bus.transactions, bus.wire_bytes, bus.bus_time(400000))
+
+# every smbus call is one transaction on the wire: a start, the address
+# byte, the register pointer and data, and for reads a repeated start and
+# a second address byte; each byte is 9 clocks with its ack
+
+import threading, time
+
+from pca9685 import (MODE1, MODE2, SUBADR1, SUBADR2, SUBADR3, ALLCALLADR,
+                     CHAN_BASE_ADDR_ON_L, ALL_LED_ON_L, ALL_LED_OFF_H,
+                     PRE_SCALE, RESTART, AI, SLEEP, ALLCALL, SUB1, SUB2, SUB3,
+                     NUM_CHANNELS, CHAN_FULL, OSC_CLOCK)
+from ina260 import (CONFIG_REG, CURRENT_REG, BUS_VOLTAGE_REG, PWR_REG,
+                    MSK_EN_REG, ALRT_LIM_REG, MFR_ID, DIE_ID, CONFIG_RST,
+                    CONFIG_DEFAULT, MFR_ID_VALUE, DIE_ID_VALUE, conversion_period,
+                    MSK_EN_CVRF, MSK_EN_CNVR, MSK_EN_AFF,
+                    MSK_EN_APOL, CURRENT_LSB, BUS_VOLTAGE_LSB, POWER_LSB)
+
+I2C_M_RD = 0x0001 # read flag of an i2c_rdwr message, as in linux/i2c.h
+
+
+class i2c_msg(object):
+    """One part of an i2c_rdwr transfer, like smbus2.i2c_msg."""
+
+    def __init__(self, addr, flags, buf):
+        self.addr = addr
+        self.flags = flags
+        self.buf = bytearray(buf)
+        self.len = len(self.buf)
+
+    @staticmethod
+    def read(addr, length):
+        return i2c_msg(addr, I2C_M_RD, bytes(length))
+
+    @staticmethod
+    def write(addr, buf):
+        return i2c_msg(addr, 0, buf)
+
+    def __iter__(self):
+        return iter(self.buf)
+
+    def __len__(self):
+        return self.len
+
+
+class FakeDevice(object):
+    """Base for device models: raw byte writes and reads at a pointer.
+
+    A model defines write(data), where the first byte sets the register
+    pointer, and read(length), length bytes from the pointer; FakeSMBus
+    calls them for each transaction addressed to it.
+    """
+
+    def __init__(self, address):
+        self.address = address
+        self.pointer = 0
+        self.transactions = 0
+
+    def responds_to(self, addr):
+        return addr == self.address
+
+
+class FakePCA9685(FakeDevice):
+    """PCA9685 register model.
+
+    Registers start at their power-on values: MODE1 0x11 (SLEEP, ALLCALL),
+    every channel full off, PRE_SCALE 0x1E. PRE_SCALE writes are ignored
+    unless MODE1.SLEEP is set, writing 1 to MODE1.RESTART clears it, the
+    pointer only advances with MODE1.AI set, and writes to the ALL_LED
+    registers load every channel. Answers at ALLCALLADR and SUBADRn when
+    the matching MODE1 bit is set.
+    """
+
+    def __init__(self, address=0x40, osc_clock=OSC_CLOCK):
+        FakeDevice.__init__(self, address)
+        self.osc_clock = osc_clock
+        self.power_on()
+
+    def power_on(self):
+        self.regs = bytearray(256)
+        self.regs[MODE1] = SLEEP | ALLCALL
+        self.regs[MODE2] = 0x04
+        self.regs[SUBADR1] = 0xE2
+        self.regs[SUBADR2] = 0xE4
+        self.regs[SUBADR3] = 0xE8
+        self.regs[ALLCALLADR] = 0xE0
+        for c in range(NUM_CHANNELS):
+            self.regs[CHAN_BASE_ADDR_ON_L + 4 * c + 3] = CHAN_FULL
+        self.regs[ALL_LED_OFF_H] = CHAN_FULL
+        self.regs[PRE_SCALE] = 0x1E
+        self.pointer = 0
+
+    def responds_to(self, addr):
+        mode1 = self.regs[MODE1]
+        return (addr == self.address
+                or (mode1 & ALLCALL and addr == self.regs[ALLCALLADR] >> 1)
+                or (mode1 & SUB1 and addr == self.regs[SUBADR1] >> 1)
+                or (mode1 & SUB2 and addr == self.regs[SUBADR2] >> 1)
+                or (mode1 & SUB3 and addr == self.regs[SUBADR3] >> 1))
+
+    def _store(self, reg, value):
+        if reg == PRE_SCALE and not self.regs[MODE1] & SLEEP:
+            return # PRE_SCALE can only be set when MODE1.SLEEP = 1
+        if reg == MODE1:
+            value &= ~RESTART # writing 1 clears it
+        self.regs[reg] = value
+        if ALL_LED_ON_L <= reg <= ALL_LED_OFF_H:
+            for c in range(NUM_CHANNELS):
+                self.regs[CHAN_BASE_ADDR_ON_L + 4 * c + reg - ALL_LED_ON_L] = value
+
+    def _advance(self):
+        if self.regs[MODE1] & AI:
+            self.pointer = (self.pointer + 1) & 0xFF
+
+    def write(self, data):
+        self.pointer = data[0]
+        for b in data[1:]:
+            self._store(self.pointer, b)
+            self._advance()
+
+    def read(self, length):
+        out = bytearray()
+        for i in range(length):
+            out.append(self.regs[self.pointer])
+            self._advance()
+        return out
+
+    def channel(self, n):
+        """(on, off) counts of channel n, full on/off bits included."""
+        i = CHAN_BASE_ADDR_ON_L + 4 * n
+        r = self.regs
+        return (r[i] | (r[i + 1] << 8), r[i + 2] | (r[i + 3] << 8))
+
+    def frame_period(self):
+        """Seconds per PWM frame at the current PRE_SCALE."""
+        return 4096 * (self.regs[PRE_SCALE] + 1) / self.osc_clock
+
+
+class FakeINA260(FakeDevice):
+    """INA260 register model.
+
+    Words go out high byte first, so through read_word_data they come back
+    byte-swapped as on the real chip. Current, bus voltage and power only
+    change once per conversion period, worked out from CONFIG_REG (AVG,
+    VBUSCT, ISHCT, MODE); current_fn(t) gives the load current in mA at
+    t seconds since power on. A read of MSK_EN_REG clears the Conversion
+    Ready flag, and the pointer stays put between reads.
+
+    alert_edges() counts every change of level on the ALERT pin, so a
+    FakeGPIO sees a pulse even if it was released and pulled again
+    between two looks at the level.
+    """
+
+    def __init__(self, address=0x45, current_fn=None, bus_voltage_mv=5000.0,
+                 clock=time.monotonic):
+        FakeDevice.__init__(self, address)
+        self.current_fn = current_fn or (lambda t: 0.0)
+        self.bus_voltage_mv = bus_voltage_mv
+        self.clock = clock
+        self._lock = threading.RLock() # the bus and a FakeGPIO both look
+        self._alert_edges = 0
+        self._alert_level = 1
+        self.power_on()
+
+    def power_on(self):
+        self.regs = {CONFIG_REG: CONFIG_DEFAULT, MSK_EN_REG: 0,
+                     ALRT_LIM_REG: 0, MFR_ID: MFR_ID_VALUE, DIE_ID: DIE_ID_VALUE}
+        self.pointer = 0
+        self.t0 = self.clock()
+        self._last_conversion = -1
+        self._byte_index = 0
+        self._track_alert()
+
+    def conversion_period(self):
+        """Seconds per complete conversion, at the configured settings."""
+        return conversion_period(self.regs[CONFIG_REG])
+
+    def _conversion(self):
+        """Index and start time of the latest completed conversion."""
+        period = self.conversion_period()
+        if period == 0.0: # power-down
+            return self._last_conversion, 0.0
+        n = int((self.clock() - self.t0) / period)
+        return n, n * period
+
+    def _update(self):
+        with self._lock:
+            self._convert()
+            self._track_alert()
+
+    def _convert(self):
+        n, t = self._conversion()
+        if n != self._last_conversion:
+            self._last_conversion = n
+            self.regs[MSK_EN_REG] |= MSK_EN_CVRF
+            ma = self.current_fn(t)
+            raw = int(round(ma / CURRENT_LSB))
+            self.regs[CURRENT_REG] = raw & 0xFFFF
+            self.regs[BUS_VOLTAGE_REG] = int(round(self.bus_voltage_mv / BUS_VOLTAGE_LSB))
+            self.regs[PWR_REG] = int(round(abs(ma) * self.bus_voltage_mv / 1000.0 / POWER_LSB))
+
+    def conversion_ready(self):
+        """Conversion Ready flag, what the ALERT pin shows with CNVR set."""
+        self._update()
+        return bool(self.regs[MSK_EN_REG] & MSK_EN_CVRF)
+
+    def alert_active(self):
+        self._update()
+        return self._alert_active()
+
+    def _alert_active(self):
+        mask = self.regs[MSK_EN_REG]
+        return bool(mask & MSK_EN_CNVR and mask & MSK_EN_CVRF) or bool(mask & MSK_EN_AFF)
+
+    def alert_pin(self):
+        """Level on the ALERT pin, 0 or 1: active low unless APOL is set."""
+        self._update()
+        return self._alert_level
+
+    def alert_edges(self):
+        """Changes of level on the ALERT pin since the model was made."""
+        self._update()
+        return self._alert_edges
+
+    def _track_alert(self):
+        active = self._alert_active()
+        level = int(active) if self.regs[MSK_EN_REG] & MSK_EN_APOL else int(not active)
+        if level != self._alert_level:
+            self._alert_level = level
+            self._alert_edges += 1
+
+    def write(self, data):
+        with self._lock:
+            self._write(data)
+            self._track_alert()
+
+    def _write(self, data):
+        self.pointer = data[0]
+        self._byte_index = 0
+        if len(data) >= 3:
+            value = (data[1] << 8) | data[2]
+            if self.pointer == CONFIG_REG:
+                if value & CONFIG_RST:
+                    self.power_on()
+                    return
+                # a write restarts conversion
+                self.t0 = self.clock()
+                self._last_conversion = -1
+            if self.pointer in (CONFIG_REG, MSK_EN_REG, ALRT_LIM_REG):
+                if self.pointer == MSK_EN_REG:
+                    # flags are read only
+                    value = (value & ~0x001C) | (self.regs[MSK_EN_REG] & 0x001C)
+                self.regs[self.pointer] = value
+
+    def read(self, length):
+        with self._lock:
+            self._update()
+            out = self._read(length)
+            self._track_alert()
+        return out
+
+    def _read(self, length):
+        value = self.regs.get(self.pointer, 0)
+        word = bytes(((value >> 8) & 0xFF, value & 0xFF))
+        out = bytearray()
+        for i in range(length):
+            out.append(word[self._byte_index % 2])
+            self._byte_index += 1
+        if self.pointer == MSK_EN_REG:
+            self.regs[MSK_EN_REG] &= ~(MSK_EN_CVRF | MSK_EN_AFF)
+        return out
+
+
+class FakeSMBus(object):
+    """Drop-in for smbus.SMBus, routing transactions to device models.
+
+    latency, seconds, is slept on every transaction to stand in for the
+    kernel and adapter overhead of a real bus; it defaults to none, so
+    runs are fast and wire traffic is just counted. Addresses nobody
+    answers raise OSError 121, like the real bus.
+    """
+
+    i2c_msg = i2c_msg # so drivers can build messages for this bus
+
+    def __init__(self, devices=(), latency=0.0):
+        self.devices = list(devices)
+        self.latency = latency
+        self._lock = threading.Lock()
+        self.reset_counts()
+
+    def reset_counts(self):
+        self.transactions = 0
+        self.wire_bytes = 0 # address, pointer and data bytes
+        self.log = [] # (address, bytes written, bytes read) per transaction
+
+    def add(self, device):
+        self.devices.append(device)
+        return device
+
+    def bus_time(self, clock_hz=100000):
+        """Modelled seconds on the wire, 9 clocks per byte plus start/stop."""
+        return (9 * self.wire_bytes + 2 * self.transactions) / clock_hz
+
+    def _targets(self, addr):
+        found = [d for d in self.devices if d.responds_to(addr)]
+        if not found:
+            raise OSError(121, "Remote I/O error")
+        return found
+
+    def _transfer(self, addr, wdata, rlen):
+        with self._lock:
+            targets = self._targets(addr)
+            out = None
+            for d in targets:
+                d.transactions += 1
+                if wdata:
+                    d.write(bytes(wdata))
+                if rlen:
+                    # broadcast reads are undefined, take the first answer
+                    r = d.read(rlen)
+                    if out is None:
+                        out = r
+            self.transactions += 1
+            self.wire_bytes += 1 + len(wdata) + ((1 if wdata else 0) + rlen if rlen else 0)
+            self.log.append((addr, len(wdata), rlen))
+        if self.latency:
+            time.sleep(self.latency)
+        return out
+
+    # smbus API
+    def write_byte(self, addr, value):
+        self._transfer(addr, [value], 0)
+
+    def read_byte(self, addr):
+        return self._transfer(addr, [], 1)[0]
+
+    def write_byte_data(self, addr, register, value):
+        self._transfer(addr, [register, value & 0xFF], 0)
+
+    def read_byte_data(self, addr, register):
+        return self._transfer(addr, [register], 1)[0]
+
+    def write_word_data(self, addr, register, value):
+        # smbus words go low byte first
+        self._transfer(addr, [register, value & 0xFF, (value >> 8) & 0xFF], 0)
+
+    def read_word_data(self, addr, register):
+        b = self._transfer(addr, [register], 2)
+        return b[0] | (b[1] << 8)
+
+    def write_i2c_block_data(self, addr, register, data):
+        self._transfer(addr, [register] + list(data), 0)
+
+    def read_i2c_block_data(self, addr, register, length=32):
+        return list(self._transfer(addr, [register], length))
+
+    def i2c_rdwr(self, *msgs):
+        """Combined transfer; each message is counted as a transaction
+        of its own, since the pointer write and reads can be split.
+        """
+        for m in msgs:
+            if m.flags & I2C_M_RD:
+                data = self._transfer(m.addr, [], m.len)
+                m.buf[:] = data
+            else:
+                self._transfer(m.addr, list(m.buf), 0)
+
+    def close(self):
+        pass
+
+
+class FakeGPIO(object):
+    """Stand-in for the RPi.GPIO module, enough for edge callbacks.
+
+    connect(pin, level_fn, edges_fn) wires an input to a function
+    returning 0 or 1, e.g. FakeINA260.alert_pin; unconnected inputs read
+    their pull. Edge callbacks run on one thread that polls the detected
+    pins every poll seconds, as RPi.GPIO runs them on a thread of its own.
+    A poll only sees levels, and misses a pulse that comes and goes
+    between two; edges_fn, e.g. FakeINA260.alert_edges, counting the
+    changes of level, lets every one of them be seen.
+    """
+
+    BOARD = 10
+    BCM = 11
+    OUT = 0
+    IN = 1
+    PUD_OFF = 20
+    PUD_DOWN = 21
+    PUD_UP = 22
+    RISING = 31
+    FALLING = 32
+    BOTH = 33
+
+    def __init__(self, poll=50e-6):
+        self.poll = poll
+        self._levels = {}
+        self._edges = {}
+        self._pulls = {}
+        self._detect = {} # pin: [edge, callback, last level, last edge count]
+        self._lock = threading.Lock()
+        self._thread = None
+
+    def setmode(self, mode):
+        pass
+
+    def setwarnings(self, flag):
+        pass
+
+    def setup(self, pin, direction, pull_up_down=PUD_OFF):
+        self._pulls[pin] = pull_up_down
+
+    def connect(self, pin, level_fn, edges_fn=None):
+        self._levels[pin] = level_fn
+        if edges_fn is not None:
+            self._edges[pin] = edges_fn
+
+    def input(self, pin):
+        if pin in self._levels:
+            return self._levels[pin]()
+        return 1 if self._pulls.get(pin) == self.PUD_UP else 0
+
+    def add_event_detect(self, pin, edge, callback=None, bouncetime=None):
+        edges_fn = self._edges.get(pin)
+        count = edges_fn() if edges_fn is not None else 0
+        with self._lock:
+            self._detect[pin] = [edge, callback, self.input(pin), count]
+        if self._thread is None:
+            self._thread = threading.Thread(target=self._watch, name="fake gpio",
+                                            daemon=True)
+            self._thread.start()
+
+    def remove_event_detect(self, pin):
+        with self._lock:
+            self._detect.pop(pin, None)
+        if not self._detect and self._thread is not None:
+            self._thread.join()
+            self._thread = None
+
+    def cleanup(self):
+        for pin in list(self._detect):
+            self.remove_event_detect(pin)
+        self._pulls.clear()
+
+    def _watch(self):
+        while True:
+            with self._lock:
+                if not self._detect:
+                    return
+                pins = list(self._detect.items())
+            for pin, d in pins:
+                edge, callback, last, count = d
+                edges_fn = self._edges.get(pin)
+                if edges_fn is None:
+                    changes = int(self.input(pin) != last)
+                else:
+                    d[3] = edges_fn()
+                    changes = d[3] - count
+                # levels alternate from the last one seen, one per change
+                for i in range(changes):
+                    level = last ^ 1 if i % 2 == 0 else last
+                    d[2] = level
+                    if callback is not None and (
+                            edge == self.BOTH or (edge == self.RISING) == bool(level)):
+                        callback(pin)
+            time.sleep(self.poll)
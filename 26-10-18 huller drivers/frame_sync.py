@@ -0,0 +1,88 @@
+# frame-synchronous servo updates
+# at 50Hz the PCA9685 only uses a new pulse width once per 20 ms frame,
+# so a sweep that writes whenever its own sleep runs out either wastes
+# bus time on values the servo never sees, or lands at a random point in
+# the frame. Here servo code only sets positions in a FrameBuffer, and
+# one scheduler task flushes it once per PWM frame, at a fixed phase of
+# the chip's frame: at most one burst per frame, and motion timing
+# follows the chip, not Python
+
+# usage:
+#   sync = FrameSync(frame)
+#   sync.attach(sched)
+#   ... anything may call frame.set_pulse(channel, width) ...
+#   sched.run()
+
+from pca9685 import PRE_SCALE, NUM_CHANNELS
+from osc_calibration import osc_for, frame_period, COUNTS_PER_FRAME
+
+
+def chip_frame_period(pwm):
+    """Seconds per PWM frame, from the shadowed PRE_SCALE and the board's
+    calibrated oscillator (25 MHz nominal if it was never calibrated).
+    """
+    return frame_period(pwm.regs.read(PRE_SCALE), osc_for(pwm.address))
+
+
+def quiet_phase(frame, channels=None):
+    """Fraction of the frame farthest from the ON offset of every channel
+    in channels (default all), the middle of the widest gap between them.
+    """
+    if channels is None:
+        channels = range(NUM_CHANNELS)
+    ons = sorted(set(frame.offsets[c] for c in channels))
+    best_on, best_gap = 0, 0
+    for i, on in enumerate(ons):
+        following = ons[i + 1] if i + 1 < len(ons) else ons[0] + COUNTS_PER_FRAME
+        if following - on > best_gap:
+            best_on, best_gap = on, following - on
+    return ((best_on + best_gap / 2.0) % COUNTS_PER_FRAME) / COUNTS_PER_FRAME
+
+
+class FrameSync(object):
+    """Flushes a FrameBuffer once per PWM frame.
+
+    phase is where in the chip's frame the write is sent, as a fraction
+    of the frame. The chip takes new ON/OFF values for a channel at the
+    end of its low time, just before its ON count, so a pulse is never
+    half applied whatever the phase; but a write landing near a channel's
+    ON count may make this pulse or the next one depending on jitter.
+    By default the phase is put as far as possible from the ON offsets
+    of channels (all, or the ones given), which with staggered offsets
+    are spread across the frame, see quiet_phase. If the chip's frame
+    start is unknown (warm start) the frames are counted from attach()
+    instead.
+    """
+
+    def __init__(self, frame, period=None, phase=None, channels=None):
+        self.frame = frame
+        self.period = chip_frame_period(frame.pwm) if period is None else period
+        self.phase = quiet_phase(frame, channels) if phase is None else phase
+        self.frames = 0 # frame ticks seen
+        self.flushes = 0 # ticks that actually sent something
+        self.task = None
+        # called each frame, before the flush, e.g. to step a trajectory
+        self.before_flush = []
+
+    def first_deadline(self, now):
+        origin = self.frame.pwm.frame_origin
+        if origin is None:
+            origin = now
+        # next frame boundary plus phase, not in the past
+        n = max(0, int((now - origin) / self.period) + 1)
+        return origin + (n + self.phase) * self.period
+
+    def tick(self):
+        """One PWM frame: run the per-frame hooks, then flush."""
+        self.frames += 1
+        # a copy, hooks may attach or detach themselves as they run
+        for fn in list(self.before_flush):
+            fn(self.frames)
+        if self.frame.flush():
+            self.flushes += 1
+
+    def attach(self, sched, name="frame sync"):
+        """Register the per-frame flush with a Scheduler."""
+        self.task = sched.every(self.period, self.tick, name,
+                                start=self.first_deadline(sched.clock()))
+        return self.task
@@ -0,0 +1,239 @@
+# INA260 current / voltage / power monitor, Texas Instruments
+# shared by the current monitor and combined servo/current scripts
+
+# usage, from a script in this folder:
+#   import smbus
+#   from ina260 import INA260
+#   ina = INA260(smbus.SMBus(1))
+#   print(ina.read_current())
+
+# the chip keeps its register pointer between reads, so a run of reads
+# of one register (the current logger) only needs to send the pointer
+# once; after that each sample is a plain 2-byte read through i2c_rdwr,
+# 3 bytes on the wire instead of 5. That needs a bus with i2c_rdwr,
+# smbus2 or the fake bus; on python-smbus every read sends the pointer
+
+from shadow_regs import ShadowRegisters
+
+try:
+    from smbus2 import i2c_msg as _i2c_msg
+except ImportError:
+    _i2c_msg = None
+
+# INA260 registers/etc:
+#INA260_ADDRESS = 0x40 # base addreass, A0 and A1 both ground
+INA260_ADDRESS = 0x45 # A0 and A1 both VS
+# A0  A1  I2C address
+# GND GND 0x40
+# VS  GND 0x41
+# GND VS  0x44
+# VS  VS  0x45
+# these, on Adafruit board
+
+CONFIG_REG = 0x00 # Configuration Register
+# All-register reset, shunt voltage & bus voltage ADC conversion times
+# averaging, operating mode
+# default: 0b01100001 00100111, 0x6127, R/W
+CURRENT_REG = 0x01 # the value of the current flowing through
+# the shunt resistor
+BUS_VOLTAGE_REG = 0x02 # Bus voltage measurement data
+PWR_REG = 0x03 # calculated power being delivered to the load
+MSK_EN_REG = 0x06 # Mask/Enable Register
+# Alert configuration and Conversion Ready flag
+ALRT_LIM_REG = 0x07 # Alert Limit Register
+# limit value to compare to the selected Alert function
+MFR_ID = 0xFE # unique manufacturer identification number
+# value: 0b0101010001001001, 0x5449, R
+DIE_ID = 0xFF # unique die identification number
+# value: 0b0010001001110000, 0x2270, R
+
+# Configuration Register bits, full table in
+# "22-01-17 current monitor/test06 INA260.py"
+# 15, RST, Reset Bit, self-clearing
+# 11–9, AVG, Averaging Mode
+# 8–6, VBUSCT, Bus Voltage Conversion Time
+# 5–3 ISHCT Shunt Current Conversion Time
+# 2–0 MODE Operating Mode
+CONFIG_RST = 0x8000
+CONFIG_DEFAULT = 0x6127
+# index is the 3 bit field value
+AVG_SAMPLES = (1, 4, 16, 64, 128, 256, 512, 1024)
+CONVERSION_TIMES = (140e-6, 204e-6, 332e-6, 588e-6,
+                    1.1e-3, 2.116e-3, 4.156e-3, 8.244e-3) # seconds
+# MODE values
+MODE_SHUTDOWN = 0b000
+MODE_CURRENT = 0b101 # continuous
+MODE_VOLTAGE = 0b110
+MODE_BOTH = 0b111
+MODE_SHUNT = 0b001 # set in MODE: measures current
+MODE_BUS = 0b010 # measures bus voltage
+
+# Mask/Enable Register bits
+MSK_EN_CNVR = 0x0400 # 10, Conversion Ready, alert on
+MSK_EN_AFF = 0x0010 # 4, Alert Function Flag
+MSK_EN_CVRF = 0x0008 # 3, Conversion Ready Flag, cleared by reading MSK_EN
+MSK_EN_APOL = 0x0002 # 1, Alert Polarity, 1 = active high
+MSK_EN_LEN = 0x0001 # 0, Alert Latch Enable
+
+CURRENT_LSB = 1.25 # mA per bit
+BUS_VOLTAGE_LSB = 1.25 # mV per bit
+POWER_LSB = 10 # mW per bit
+
+MFR_ID_VALUE = 0x5449
+DIE_ID_VALUE = 0x2270
+
+
+def config_word(mode, avg, vbusct, ishct):
+    """CONFIG_REG value from field values, each the 3 bit code."""
+    return 0x6000 | (avg << 9) | (vbusct << 6) | (ishct << 3) | mode
+
+def conversion_period(config):
+    """Seconds per complete conversion (every measured channel, averaged)
+    at a CONFIG_REG value; 0.0 in power-down.
+    """
+    mode = config & 0x07
+    t = 0.0
+    if mode & MODE_SHUNT:
+        t += CONVERSION_TIMES[(config >> 3) & 0x07]
+    if mode & MODE_BUS:
+        t += CONVERSION_TIMES[(config >> 6) & 0x07]
+    return t * AVG_SAMPLES[(config >> 9) & 0x07]
+
+
+def read_unsigned_16bit(bus, address, register):
+    v = bus.read_word_data(address, register) & 0xFFFF
+    # reverse the byte order
+    v = ((v << 8) & 0xFF00) + (v >> 8)
+    return v
+
+def read_signed_16bit(bus, address, register):
+    v = read_unsigned_16bit(bus, address, register)
+    if v > 32767:
+        v -= 65536
+    return v
+
+def write_unsigned_16bit(bus, address, register, v):
+    # INA260 registers are sent high byte first, smbus words low byte first
+    v = ((v << 8) & 0xFF00) + ((v >> 8) & 0xFF)
+    bus.write_word_data(address, register, v)
+
+
+class INA260(object):
+    """INA260 on an smbus-style bus.
+
+    CONFIG_REG, MSK_EN_REG, ALRT_LIM_REG and the two ID registers are held
+    in a write-through shadow cache (self.regs); they are read from the
+    chip once and after that only when resync() is called.
+    """
+
+    def __init__(self, bus, address=INA260_ADDRESS, fast_reads=True):
+        self._bus = bus
+        self.address = address
+        self.regs = ShadowRegisters(self._read_word, self._write_word,
+                                    (CONFIG_REG, MSK_EN_REG, ALRT_LIM_REG,
+                                     MFR_ID, DIE_ID))
+        self._pointer = None # unknown until we set it
+        self._read_msg = None
+        if fast_reads and hasattr(bus, "i2c_rdwr"):
+            msg_class = getattr(bus, "i2c_msg", None) or _i2c_msg
+            if msg_class is not None:
+                # one message, reused for every fast read
+                self._read_msg = msg_class.read(address, 2)
+
+    def _read_word(self, register):
+        v = read_unsigned_16bit(self._bus, self.address, register)
+        self._pointer = register
+        return v
+
+    def _write_word(self, register, value):
+        write_unsigned_16bit(self._bus, self.address, register, value)
+        self._pointer = register
+
+    def read_register(self, register):
+        """Unsigned register value; when the pointer is already at
+        register, a plain read that doesn't send it again.
+        """
+        if register == self._pointer and self._read_msg is not None:
+            msg = self._read_msg
+            try:
+                self._bus.i2c_rdwr(msg)
+            except AttributeError:
+                # a wrapper offering i2c_rdwr over a bus without it
+                self._read_msg = None
+                return self._read_word(register)
+            hi, lo = msg
+            return (hi << 8) | lo
+        return self._read_word(register)
+
+    def forget_pointer(self):
+        """Send the pointer with the next read; for when something else,
+        another process or a raw bus call, may have moved it.
+        """
+        self._pointer = None
+
+    def resync(self):
+        """Re-read the shadowed registers, e.g. after a suspected chip reset."""
+        self._pointer = None
+        self.regs.resync()
+
+    def reset(self):
+        """All-register reset; the shadow copies go back to the defaults."""
+        self._write_word(CONFIG_REG, CONFIG_RST)
+        self._pointer = None
+        self.regs.invalidate()
+
+    def configure(self, config):
+        """Write CONFIG_REG, through the shadow copy; conversion restarts.
+        Returns the new conversion period in seconds.
+        """
+        self.regs.write(CONFIG_REG, config)
+        return conversion_period(config)
+
+    def conversion_period(self):
+        """Seconds per conversion at the current CONFIG_REG setting."""
+        return conversion_period(self.regs.read(CONFIG_REG))
+
+    def mfr_id(self):
+        return self.regs.read(MFR_ID)
+
+    def die_id(self):
+        return self.regs.read(DIE_ID)
+
+    def enable_conversion_ready(self, latch=True, active_high=False):
+        """Route the Conversion Ready flag to the ALERT pin.
+
+        The pin is open drain, pulled low (or high with active_high) when
+        a conversion completes. Latched, it stays there until clear_alert()
+        reads MSK_EN_REG, so a slow reader can't miss an edge.
+        """
+        bits = MSK_EN_CNVR
+        if latch:
+            bits |= MSK_EN_LEN
+        if active_high:
+            bits |= MSK_EN_APOL
+        self.regs.write(MSK_EN_REG, bits)
+
+    def disable_alert(self):
+        self.regs.write(MSK_EN_REG, 0)
+
+    def clear_alert(self):
+        """Read MSK_EN_REG from the chip, not the shadow copy: this clears
+        the Conversion Ready flag and releases the ALERT pin. Returns the
+        register, flags included.
+        """
+        return self._read_word(MSK_EN_REG)
+
+    def read_current(self):
+        """Raw signed current, 1.25 mA per bit."""
+        v = self.read_register(CURRENT_REG)
+        if v > 32767:
+            v -= 65536
+        return v
+
+    def read_bus_voltage(self):
+        """Raw bus voltage, 1.25 mV per bit."""
+        return self.read_register(BUS_VOLTAGE_REG)
+
+    def read_power(self):
+        """Raw power, 10 mW per bit."""
+        return self.read_register(PWR_REG)
@@ -0,0 +1,67 @@
+# INA260 readings to engineering units, whole arrays at a time
+# read_unsigned_16bit swaps the bytes and read_signed_16bit fixes the sign
+# one value at a time in Python, and nothing scales to mA/mV/mW; at kHz
+# logging rates that costs more than the I2C read. Here buffers of raw
+# words are decoded in one NumPy pass each
+
+# what comes off the bus: read_word_data gives the chip's high byte in
+# the low byte of the word, so a buffer of those words, stored little
+# endian, holds the register values big endian: reading the bytes as
+# ">u2" or ">i2" does the swap and the sign at once
+
+# usage:
+#   words = array.array("H", (bus.read_word_data(0x45, CURRENT_REG) for i in range(n)))
+#   ma = current_ma(words)
+#   ma = current_ma(sampler.ring.values[:, 0], swapped=True)
+#   ma, mv, mw = to_units(sampler.ring.values, sampler.columns)
+
+import numpy as np
+
+from ina260 import CURRENT_LSB, BUS_VOLTAGE_LSB, POWER_LSB
+from ina260_sampler import CURRENT, BUS_VOLTAGE, POWER
+
+_BUS_WORDS = np.dtype("<u2")
+
+
+def register_values(words, signed=False, swapped=False):
+    """Register values from raw bus words: a bytes-like buffer, array or
+    sequence of read_word_data results. swapped means the byte swap is
+    already done, as for ring buffer values. uint16, or int16 if signed;
+    a view where the input allows, otherwise a new array.
+    """
+    if isinstance(words, (bytes, bytearray, memoryview)):
+        w = np.frombuffer(words, dtype=_BUS_WORDS)
+    else:
+        w = np.asarray(words)
+        if w.dtype.itemsize != 2:
+            w = w.astype(_BUS_WORDS)
+    if swapped:
+        return w.view(np.int16 if signed else np.uint16)
+    # the same bytes, read big endian
+    return w.view(">i2" if signed else ">u2")
+
+def current_ma(words, swapped=False):
+    """Current, mA, float64."""
+    return register_values(words, True, swapped) * CURRENT_LSB
+
+def bus_voltage_mv(words, swapped=False):
+    """Bus voltage, mV, float64."""
+    return register_values(words, False, swapped) * BUS_VOLTAGE_LSB
+
+def power_mw(words, swapped=False):
+    """Power, mW, float64."""
+    return register_values(words, False, swapped) * float(POWER_LSB)
+
+def to_units(values, columns=(CURRENT,)):
+    """(current mA, bus voltage mV, power mW) from ring buffer values;
+    columns is the sampler's columns, saying what each one holds.
+    Quantities not sampled come back as None.
+    """
+    columns = tuple(columns)
+    if values.shape[1] != len(columns):
+        raise ValueError("{0} columns of values, {1} column ids".format(
+            values.shape[1], len(columns)))
+    decoders = {CURRENT: current_ma, BUS_VOLTAGE: bus_voltage_mv, POWER: power_mw}
+    return tuple(decoders[c](values[:, columns.index(c)], swapped=True)
+                 if c in columns else None
+                 for c in (CURRENT, BUS_VOLTAGE, POWER))
@@ -0,0 +1,95 @@
+# INA260 sample-rate planner
+# the scripts all run at the power-on CONFIG_REG, 0x6127: current and bus
+# voltage, 1.1 ms each, no averaging, a new reading every 2.2 ms whatever
+# we actually need. Here we ask for what we want, e.g. current only, at
+# least 200 samples/s, noise no worse than 1.5 mA, and the planner picks
+# MODE, AVG, ISHCT and VBUSCT, and says what sample period that gives, so
+# the sampler can be paced to the chip
+
+# usage:
+#   plan = plan_sampling(rate=200, noise_ma=1.5)
+#   period = ina.configure(plan.config)
+#   sampler = INA260Sampler(ina, period=period)
+
+# noise model: the ADC averages over its conversion time, so with white
+# noise the rms falls as 1/sqrt(conversion time * AVG), down to the
+# 1.25 mA step, whose own rms is 1.25/sqrt(12). CURRENT_NOISE_MA stands
+# for the rms of single unaveraged 1.1 ms conversions; it is a rough
+# starting figure, not a measurement: take the standard deviation of a
+# ring buffer of samples at a steady load on the real board and pass it
+# in as noise_ref_ma
+
+import math
+
+from ina260 import (AVG_SAMPLES, CONVERSION_TIMES, CURRENT_LSB, MODE_CURRENT,
+                    MODE_VOLTAGE, MODE_BOTH, config_word, conversion_period)
+
+CURRENT_NOISE_MA = 2.5 # rms, 1.1 ms conversion, AVG 1
+NOISE_REF_TIME = CONVERSION_TIMES[4] # the 1.1 ms that was measured at
+QUANTIZATION_NOISE_MA = CURRENT_LSB / math.sqrt(12)
+
+
+class SamplePlan(object):
+    """CONFIG_REG fields picked by plan_sampling, and what they give."""
+
+    def __init__(self, mode, avg, vbusct, ishct, noise_ma):
+        self.mode = mode
+        self.avg = avg
+        self.vbusct = vbusct
+        self.ishct = ishct
+        self.noise_ma = noise_ma # expected rms current noise
+        self.config = config_word(mode, avg, vbusct, ishct)
+        self.period = conversion_period(self.config) # seconds per sample
+
+    @property
+    def rate(self):
+        return 1.0 / self.period
+
+    def __repr__(self):
+        return ("SamplePlan(config=0x{0:04X}, AVG {1}, ISHCT {2:.0f} us, "
+                "VBUSCT {3:.0f} us, {4:.1f} samples/s, {5:.2f} mA rms)").format(
+                    self.config, AVG_SAMPLES[self.avg],
+                    1e6 * CONVERSION_TIMES[self.ishct],
+                    1e6 * CONVERSION_TIMES[self.vbusct], self.rate, self.noise_ma)
+
+
+def current_noise(avg, ishct, noise_ref_ma=CURRENT_NOISE_MA):
+    """Expected rms current noise, mA, for AVG and ISHCT codes."""
+    averaged = AVG_SAMPLES[avg] * CONVERSION_TIMES[ishct]
+    n = noise_ref_ma * math.sqrt(NOISE_REF_TIME / averaged)
+    return math.sqrt(n * n + QUANTIZATION_NOISE_MA * QUANTIZATION_NOISE_MA)
+
+def plan_sampling(rate=None, noise_ma=None, current=True, voltage=False,
+                  noise_ref_ma=CURRENT_NOISE_MA):
+    """Pick a continuous-mode configuration.
+
+    rate is the minimum samples per second, noise_ma the worst rms current
+    noise acceptable; either may be left out. Given a rate, the setting
+    averaging longest within it wins, the quietest; given only a noise
+    limit, the fastest setting meeting it. With voltage measured as well,
+    VBUSCT follows ISHCT, as at power on; with voltage only, noise_ma
+    doesn't apply. ValueError if nothing fits.
+    """
+    if not (current or voltage):
+        raise ValueError("nothing to measure")
+    mode = MODE_BOTH if current and voltage else (MODE_CURRENT if current else MODE_VOLTAGE)
+    best = best_key = None
+    for avg in range(len(AVG_SAMPLES)):
+        for ct in range(len(CONVERSION_TIMES)):
+            noise = current_noise(avg, ct, noise_ref_ma) if current else 0.0
+            # VBUSCT left at its default when the bus isn't measured
+            plan = SamplePlan(mode, avg, ct if voltage else 4,
+                              ct if current else 4, noise)
+            if rate is not None and plan.rate < rate:
+                continue
+            if noise_ma is not None and noise > noise_ma:
+                continue
+            # time averaged per sample on the measured channel
+            averaged = AVG_SAMPLES[avg] * CONVERSION_TIMES[ct]
+            key = (-averaged, plan.period) if rate is not None else (plan.period, -averaged)
+            if best is None or key < best_key:
+                best, best_key = plan, key
+    if best is None:
+        raise ValueError("no INA260 setting gives {0} samples/s at {1} mA rms".format(
+            rate, noise_ma))
+    return best
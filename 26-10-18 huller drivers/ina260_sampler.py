@@ -0,0 +1,204 @@
+# streaming INA260 sampler
+# servo_current.py and "test06 INA260.py" read CURRENT_REG in a while True
+# loop and print every sample: the console does most of the work, and
+# nothing is kept. Here a background thread reads current (and if asked,
+# bus voltage and power) into a preallocated NumPy ring buffer of raw
+# register values, with a time.monotonic() stamp per sample, and
+# consumers look at the data through views, without copying
+
+# usage:
+#   sampler = INA260Sampler(INA260(smbus.SMBus(1)), capacity=65536)
+#   sampler.start()
+#   ...
+#   ts, values = sampler.ring.latest(1000) # newest 1000, as views
+#   sampler.stop()
+
+# or, once per conversion, off the ALERT pin (Conversion Ready), wired to
+# a Raspberry Pi input:
+#   import RPi.GPIO as GPIO
+#   GPIO.setmode(GPIO.BCM)
+#   sampler = AlertSampler(ina, GPIO, pin=24)
+
+# values are the raw 16 bit register contents, stored as int16: the
+# current column is signed as it stands (1.25 mA per bit); bus voltage
+# and power are unsigned, look at them through values.view(np.uint16);
+# ina260_decode.to_units(values, sampler.columns) gives mA, mV and mW
+
+import threading, time
+
+import numpy as np
+
+from ina260 import (CURRENT_REG, BUS_VOLTAGE_REG, PWR_REG, MSK_EN_REG,
+                    MSK_EN_CVRF, MSK_EN_AFF)
+
+CURRENT = 0
+BUS_VOLTAGE = 1
+POWER = 2
+COLUMNS = (CURRENT_REG, BUS_VOLTAGE_REG, PWR_REG)
+MSK_EN_FLAGS = MSK_EN_AFF | MSK_EN_CVRF # read only, never written back
+
+
+def _read_row(read, registers, row):
+    for j, register in enumerate(registers):
+        v = read(register)
+        row[j] = v - 65536 if v > 32767 else v # as int16
+
+
+class RingBuffer(object):
+    """Fixed-size buffer of timestamped samples, one column per register.
+
+    count is the total number of samples ever written; sample number s
+    lives at row s % capacity until it is overwritten capacity samples
+    later. One writer thread, any number of readers.
+    """
+
+    def __init__(self, capacity, columns=3):
+        self.capacity = capacity
+        self.timestamps = np.zeros(capacity, dtype=np.float64)
+        self.values = np.zeros((capacity, columns), dtype=np.int16)
+        self.count = 0
+
+    def append(self, t, row):
+        i = self.count % self.capacity
+        self.timestamps[i] = t
+        self.values[i, :len(row)] = row
+        # published last, so readers never see a half-written row
+        self.count += 1
+
+    def span(self, start, end):
+        """Views of samples start to end-1, as one or two (ts, values)
+        pieces; two when the span wraps round the end of the buffer.
+        """
+        start = max(start, end - self.capacity, 0)
+        if start >= end:
+            return []
+        a, b = start % self.capacity, end % self.capacity
+        if a < b or b == 0:
+            b = b or self.capacity
+            return [(self.timestamps[a:b], self.values[a:b])]
+        return [(self.timestamps[a:], self.values[a:]),
+                (self.timestamps[:b], self.values[:b])]
+
+    def latest(self, n):
+        """The newest n samples as (ts, values); views when they don't
+        wrap round, otherwise a copy joining the two pieces.
+        """
+        end = self.count
+        pieces = self.span(end - n, end)
+        if not pieces:
+            return self.timestamps[:0], self.values[:0]
+        if len(pieces) == 1:
+            return pieces[0]
+        return (np.concatenate([p[0] for p in pieces]),
+                np.concatenate([p[1] for p in pieces]))
+
+    def since(self, seq):
+        """(new seq, pieces) of everything written after sample seq, for
+        a consumer that keeps its place; samples it fell too far behind
+        on are skipped.
+        """
+        end = self.count
+        return end, self.span(seq, end)
+
+
+class INA260Sampler(object):
+    """Background thread filling a RingBuffer from an INA260.
+
+    columns picks the registers: (CURRENT,) for current only, the
+    default, or (CURRENT, BUS_VOLTAGE, POWER). period paces the samples
+    against absolute deadlines; None reads as fast as the bus allows.
+    """
+
+    def __init__(self, ina, capacity=65536, columns=(CURRENT,), period=None):
+        self.ina = ina
+        self.columns = tuple(columns)
+        self.period = period
+        self.ring = RingBuffer(capacity, len(self.columns))
+        self._stop = threading.Event()
+        self._thread = None
+
+    def start(self):
+        self._stop.clear()
+        self._thread = threading.Thread(target=self._run, name="ina260 sampler",
+                                        daemon=True)
+        self._thread.start()
+        return self
+
+    def stop(self):
+        self._stop.set()
+        if self._thread is not None:
+            self._thread.join()
+            self._thread = None
+
+    def _run(self):
+        registers = [COLUMNS[c] for c in self.columns]
+        ring = self.ring
+        # current only keeps the pointer on CURRENT_REG: plain reads
+        read = self.ina.read_register
+        clock = time.monotonic
+        deadline = clock()
+        row = [0] * len(registers)
+        while not self._stop.is_set():
+            t = clock()
+            _read_row(read, registers, row)
+            ring.append(t, row)
+            if self.period is not None:
+                deadline += self.period
+                delay = deadline - clock()
+                if delay > 0:
+                    time.sleep(delay)
+
+
+class AlertSampler(INA260Sampler):
+    """Reads the INA260 once per conversion, off the ALERT pin.
+
+    Polling reads the same conversion over and over (1.1 ms each at the
+    default settings) and counts the repeats as samples. Here MSK_EN_REG
+    routes Conversion Ready to ALERT, latched, and a GPIO edge callback,
+    as in irt_test02.py, clears the flag and reads the new values. gpio is
+    the RPi.GPIO module, set up with setmode() already, and pin the input
+    ALERT is wired to; ALERT is open drain, so the input is pulled up and
+    the falling edge taken.
+
+    The callback assumes its reads finish inside one conversion period;
+    at the shortest conversion times a sample can come from the
+    conversion after the one that raised the edge.
+    """
+
+    def __init__(self, ina, gpio, pin, capacity=65536, columns=(CURRENT,)):
+        INA260Sampler.__init__(self, ina, capacity, columns)
+        self.gpio = gpio
+        self.pin = pin
+        self.spurious = 0 # edges with no Conversion Ready flag behind them
+        self._registers = [COLUMNS[c] for c in self.columns]
+        self._row = [0] * len(self._registers)
+        self._saved = None
+        self._lock = threading.Lock() # start() and the callback share the chip
+
+    def start(self):
+        ina, gpio = self.ina, self.gpio
+        self._saved = ina.regs.read(MSK_EN_REG)
+        gpio.setup(self.pin, gpio.IN, pull_up_down=gpio.PUD_UP)
+        ina.enable_conversion_ready(latch=True)
+        gpio.add_event_detect(self.pin, gpio.FALLING, callback=self._on_alert)
+        # armed first: ALERT may already be low from a conversion, which
+        # gives no edge until it is released; releasing it now means the
+        # next conversion is seen, whenever it lands
+        with self._lock:
+            ina.clear_alert()
+        return self
+
+    def stop(self):
+        self.gpio.remove_event_detect(self.pin)
+        if self._saved is not None:
+            self.ina.regs.write(MSK_EN_REG, self._saved & ~MSK_EN_FLAGS)
+            self._saved = None
+
+    def _on_alert(self, pin):
+        t = time.monotonic()
+        with self._lock:
+            if not self.ina.clear_alert() & MSK_EN_CVRF:
+                self.spurious += 1
+                return
+            _read_row(self.ina.read_register, self._registers, self._row)
+        self.ring.append(t, self._row)
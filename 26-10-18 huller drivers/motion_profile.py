@@ -0,0 +1,93 @@
+# servo motion profiles
+# the seed-lift scripts step through range(clockwise_limit,
+# counterclockwise_limit, position_step) with a fixed time.sleep, the
+# same speed from end to end; here a move accelerates, cruises and
+# decelerates, so it is quicker overall and gentler at the ends
+
+# positions are PCA9685 pulse counts, one per PWM frame, as NumPy arrays
+# velocity in counts per second, acceleration in counts per second^2
+
+# trapezoid: constant acceleration up to max velocity, cruise, constant
+#   deceleration
+# S-curve: acceleration rises and falls as sin^2, so there is no step in
+#   acceleration (no jerk spike) at the start and end of each ramp; its
+#   peak is max acceleration, so ramps take twice as long as trapezoid
+
+import math, time
+
+import numpy as np
+
+TRAPEZOID = "trapezoid"
+SCURVE = "scurve"
+
+
+def _ramp_trapezoid(t, amax):
+    return 0.5 * amax * t * t
+
+def _ramp_scurve(t, amax, t_acc):
+    # integral of integral of amax * sin^2(pi t / t_acc)
+    w = 2 * math.pi / t_acc
+    return amax * (t * t / 4 + (np.cos(w * t) - 1) / (2 * w * w))
+
+def move_timing(distance, vmax, amax, kind=TRAPEZOID):
+    """(accel time, cruise time, peak velocity) for a move of distance counts."""
+    # on average the S-curve ramp accelerates at half its peak
+    a_avg = amax if kind == TRAPEZOID else amax / 2.0
+    vpeak = vmax
+    if distance < vmax * vmax / a_avg:
+        # never reaches vmax, triangular velocity
+        vpeak = math.sqrt(distance * a_avg)
+    t_acc = vpeak / a_avg
+    t_cruise = 0.0
+    if vpeak > 0:
+        t_cruise = max(0.0, (distance - vpeak * t_acc) / vpeak)
+    return t_acc, t_cruise, vpeak
+
+def profile(start, end, vmax, amax, frame_rate, kind=TRAPEZOID):
+    """Pulse counts, one per PWM frame, moving from start to end.
+
+    The first value is start, the last is exactly end.
+    """
+    if kind not in (TRAPEZOID, SCURVE):
+        raise ValueError("unknown profile {0}".format(kind))
+    distance = abs(end - start)
+    if distance == 0:
+        return np.array([start], dtype=np.uint16)
+    t_acc, t_cruise, vpeak = move_timing(distance, vmax, amax, kind)
+    total = 2 * t_acc + t_cruise
+    n = int(math.ceil(total * frame_rate))
+    t = np.arange(n + 1) / float(frame_rate)
+    t[-1] = total
+
+    if kind == TRAPEZOID:
+        ramp = lambda x: _ramp_trapezoid(x, amax)
+    else:
+        ramp = lambda x: _ramp_scurve(x, amax, t_acc)
+    ramp_end = vpeak * t_acc / 2.0 # distance covered while accelerating
+    s = np.where(t < t_acc, ramp(np.minimum(t, t_acc)),
+         np.where(t < t_acc + t_cruise, ramp_end + vpeak * (t - t_acc),
+                  distance - ramp(np.clip(total - t, 0.0, t_acc))))
+    direction = 1 if end > start else -1
+    return np.rint(start + direction * s).astype(np.uint16)
+
+def trapezoid(start, end, vmax, amax, frame_rate):
+    return profile(start, end, vmax, amax, frame_rate, TRAPEZOID)
+
+def scurve(start, end, vmax, amax, frame_rate):
+    return profile(start, end, vmax, amax, frame_rate, SCURVE)
+
+
+def play(frame, channel, positions, frame_period, sleep=time.sleep):
+    """Send positions one per PWM frame, through a FrameBuffer.
+
+    Each point waits for an absolute deadline, so time spent on the bus
+    doesn't add up into drift the way a fixed sleep after each write does.
+    """
+    deadline = time.monotonic()
+    for p in positions:
+        frame.set_pulse(channel, int(p))
+        frame.flush()
+        deadline += frame_period
+        delay = deadline - time.monotonic()
+        if delay > 0:
+            sleep(delay)
@@ -0,0 +1,106 @@
+# PCA9685 oscillator calibration
+# The datasheet says the internal oscillator is 25 MHz, but on our boards
+# the computed PRE_SCALE for 50Hz, round(OSC_CLOCK/(4096*50)) - 1, gives a
+# frame rate that is visibly off, and the scripts hard-code 0x7C instead.
+# The internal oscillator is only good to a few percent and differs board
+# to board, so here the effective clock is derived per board from a
+# measured frame period (scope, logic analyser) and kept in a small
+# calibration file keyed by I2C address.
+
+# PWM counter runs at osc/(PRE_SCALE+1), 4096 counts per frame, so
+#   frame period = 4096 * (PRE_SCALE + 1) / osc
+#   osc          = 4096 * (PRE_SCALE + 1) / frame period
+# e.g. 0x7C giving a true 50Hz means osc is about 25.6 MHz
+
+import json, os
+
+from pca9685 import OSC_CLOCK
+
+PRESCALE_MIN = 0x03 # max, 1526 Hz
+PRESCALE_MAX = 0xFF # min, 24 Hz
+COUNTS_PER_FRAME = 4096
+
+# kept next to the scripts, one entry per board address
+CAL_FILE = os.path.join(os.path.dirname(os.path.abspath(__file__)),
+                        "pca9685_cal.json")
+
+
+def osc_from_period(prescale_value, frame_period):
+    """Effective oscillator, Hz, from a measured frame period in seconds."""
+    return COUNTS_PER_FRAME * (prescale_value + 1) / frame_period
+
+def osc_from_frequency(prescale_value, frame_freq):
+    """Effective oscillator, Hz, from a measured frame rate in Hz."""
+    return osc_from_period(prescale_value, 1.0 / frame_freq)
+
+def prescale_for(freq_hz, osc_clock=OSC_CLOCK):
+    """PRE_SCALE value nearest to freq_hz, clamped to the chip's range."""
+    p = round(osc_clock / (COUNTS_PER_FRAME * freq_hz)) - 1
+    return max(PRESCALE_MIN, min(PRESCALE_MAX, p))
+
+def frame_period(prescale_value, osc_clock=OSC_CLOCK):
+    """Seconds per PWM frame."""
+    return COUNTS_PER_FRAME * (prescale_value + 1) / osc_clock
+
+def pulse_counts(pulse_ms, prescale_value, osc_clock=OSC_CLOCK):
+    """Counter value for a pulse width in ms, e.g. 1.5 ms servo center."""
+    count_s = (prescale_value + 1) / osc_clock
+    return min(COUNTS_PER_FRAME - 1, round(pulse_ms / 1000.0 / count_s))
+
+def pulse_count_table(pulses_ms, prescale_value, osc_clock=OSC_CLOCK):
+    """List of counter values, one per pulse width in pulses_ms."""
+    return [pulse_counts(p, prescale_value, osc_clock) for p in pulses_ms]
+
+
+def load_calibrations(path=CAL_FILE):
+    """Dict of I2C address to effective oscillator Hz; empty if no file."""
+    try:
+        with open(path) as f:
+            raw = json.load(f)
+    except FileNotFoundError:
+        return {}
+    return {int(k, 16): v for k, v in raw.items()}
+
+def save_calibration(address, osc_clock, path=CAL_FILE):
+    """Store one board's effective oscillator, keeping the other entries."""
+    cals = load_calibrations(path)
+    cals[address] = osc_clock
+    tmp = path + ".tmp"
+    with open(tmp, "w") as f:
+        json.dump({hex(k): v for k, v in sorted(cals.items())}, f, indent=1)
+    os.replace(tmp, path) # don't leave a half-written file
+
+def osc_for(address, path=CAL_FILE):
+    """Calibrated oscillator for a board, or the 25 MHz nominal."""
+    return load_calibrations(path).get(address, OSC_CLOCK)
+
+
+class OscCalibration(object):
+    """Calibrated timing for one PCA9685 board."""
+
+    def __init__(self, address, osc_clock=None, path=CAL_FILE):
+        self.address = address
+        self.path = path
+        self.osc_clock = osc_for(address, path) if osc_clock is None else osc_clock
+
+    def calibrate_period(self, prescale_value, measured_period):
+        """Set the oscillator from a measured frame period, and save it."""
+        self.osc_clock = osc_from_period(prescale_value, measured_period)
+        save_calibration(self.address, self.osc_clock, self.path)
+        return self.osc_clock
+
+    def calibrate_frequency(self, prescale_value, measured_freq):
+        """Set the oscillator from a measured frame rate, and save it."""
+        return self.calibrate_period(prescale_value, 1.0 / measured_freq)
+
+    def prescale(self, freq_hz):
+        return prescale_for(freq_hz, self.osc_clock)
+
+    def frame_period(self, prescale_value):
+        return frame_period(prescale_value, self.osc_clock)
+
+    def pulse_counts(self, pulse_ms, prescale_value):
+        return pulse_counts(pulse_ms, prescale_value, self.osc_clock)
+
+    def pulse_count_table(self, pulses_ms, prescale_value):
+        return pulse_count_table(pulses_ms, prescale_value, self.osc_clock)
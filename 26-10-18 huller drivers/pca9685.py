@@ -0,0 +1,344 @@
+# PCA9685 PWM driver, shared by the servo, seed picker and buzzer scripts
+# NXP Semiconductors PCA9685, 16 channels of 12-bit PWM
+# The PCA9685 is designed for PWM dimming of LEDs, which explains why registers
+# are named e.g. "LED0_ON_L", but these are just channel numbers and the PWM
+# signal works fine for servo control
+
+# usage, from a script in this folder:
+#   import smbus
+#   from pca9685 import PCA9685
+#   pwm = PCA9685(smbus.SMBus(1))
+#   pwm.begin(0x7C) # 50Hz, emperically
+#   pwm.set_pwm(0, 0, 300)
+
+import time
+from shadow_regs import ShadowRegisters
+
+# PCA9685 registers/etc:
+PCA9685_ADDRESS    = 0x40 # address lines A0-A5 all low
+MODE1              = 0x00
+# Bits (*=default)
+# 7 RESTART
+# 6 EXTCLK
+# 5 AI R/W
+#    0* Register Auto-Increment disabled.
+#    1 Register Auto-Increment enabled.
+# 4 SLEEP R/W
+#    0 Normal mode.
+#    1* Low power mode. Oscillator off.
+# 3 SUB1, 2 SUB2, 1 SUB3
+# 0 ALLCALL
+# (full descriptions in "21-11-20 seed picker tests/07 HXT900 lift seed.py")
+MODE2              = 0x01
+SUBADR1            = 0x02
+SUBADR2            = 0x03
+SUBADR3            = 0x04
+ALLCALLADR         = 0x05
+# I2C addresses, in the 7 bit Python/RPi nomenclature
+# (datasheet gives 8 bit, e.g. ALLCALLADR default 0xE0 = 0x70 here)
+ALLCALL_ADDRESS    = 0x70 # LED All Call, all boards with MODE1.ALLCALL set
+SUBADR_DEFAULTS    = {1: 0x71, 2: 0x72, 3: 0x74}
+
+# channel base addresses
+# all channels are strictly in increments of 4
+# e.g. LEDn_ON_L = CHAN_BASE_ADDR_ON_L + 4*n
+CHAN_BASE_ADDR_ON_L          = 0x06
+CHAN_BASE_ADDR_ON_H          = 0x07
+CHAN_BASE_ADDR_OFF_L         = 0x08
+CHAN_BASE_ADDR_OFF_H         = 0x09
+
+ALL_LED_ON_L       = 0xFA
+ALL_LED_ON_H       = 0xFB
+ALL_LED_OFF_L      = 0xFC
+ALL_LED_OFF_H      = 0xFD
+PRE_SCALE          = 0xFE  # prescale register for PWM output frequency
+# max 1526 Hz = 0x03h
+# min 24 Hz = 0xFFh
+# PRE_SCALE can only be set when MODE1.SLEEP = 1
+# calculate: PRE_SCALE = round(osc/(4096*freq))-1
+
+# Bits:
+RESTART            = 0x80
+AI                 = 0x20
+SLEEP              = 0x10
+SUB1               = 0x08
+SUB2               = 0x04
+SUB3               = 0x02
+ALLCALL            = 0x01
+INVRT              = 0x10
+OUTDRV             = 0x04
+
+NUM_CHANNELS = 16
+MAX_HIGH = 4095 # maximum of PCA9685 counter
+# CHAN_FULL, bit 4, turns a channel full on or off
+# written to CHANn_ON_H turns full on
+# written to CHANn_OFF_H turns full off
+CHAN_FULL = 0x10
+OSC_CLOCK = 25000000 # default on-chip, 25 MHz
+# smbus block transfers carry at most 32 data bytes
+I2C_BLOCK_MAX = 32
+
+
+def chan_bytes(on, off):
+    """The four register bytes ON_L, ON_H, OFF_L, OFF_H of one channel."""
+    return [on & 0xFF, on >> 8, off & 0xFF, off >> 8]
+
+
+class PCA9685(object):
+    """PCA9685 PWM servo/LED controller on an smbus-style bus.
+
+    With block_writes on (the default), each channel update is a single
+    4-byte I2C block write starting at LEDn_ON_L; the chip steps through
+    ON_L, ON_H, OFF_L, OFF_H because MODE1.AI is set. With it off, the four
+    registers are written one byte at a time, as test02.py used to.
+
+    MODE1, MODE2 and PRE_SCALE are held in a write-through shadow cache
+    (self.regs), so changing the frequency does not read MODE1 back first.
+    """
+
+    def __init__(self, bus, address=PCA9685_ADDRESS, block_writes=True):
+        self._bus = bus
+        self.address = address
+        self.block_writes = block_writes
+        self.regs = ShadowRegisters(self._read_byte, self._write_byte,
+                                    (MODE1, MODE2, PRE_SCALE))
+        # time.monotonic() when the PWM counter last started from 0, if
+        # we know it, i.e. we woke the chip ourselves
+        self.frame_origin = None
+
+    def _read_byte(self, register):
+        return self._bus.read_byte_data(self.address, register)
+
+    def _write_byte(self, register, value):
+        self._bus.write_byte_data(self.address, register, value)
+
+    def resync(self):
+        """Re-read the shadowed registers, e.g. after a suspected chip reset."""
+        self.regs.resync()
+
+    def reset(self, prescale_value):
+        """Sleep the chip, set PRE_SCALE, then wake it with auto-increment on."""
+        # enable PRE_SCALE change, set MODE1.SLEEP = 1
+        # going to sleep takes effect at once; the old scripts' .25 s
+        # "delay for reset" here was not needed
+        # MODE1.ALLCALL is kept at its power-on 1, so a bank of boards
+        # can still be reached together at ALLCALLADR
+        self.regs.write(MODE1, SLEEP | ALLCALL)
+        self.regs.write(PRE_SCALE, prescale_value)
+        # enable the PWM chip: clear MODE1.SLEEP bit 4
+        # auto-increment address after write: set MODE1.AI bit 5
+        self.regs.write(MODE1, AI | ALLCALL)
+        time.sleep(0.0005) # oscillator startup, 500us max
+        self.frame_origin = time.monotonic()
+
+    def begin(self, prescale_value):
+        """Warm-start init: reset only if the chip is not already running
+        at prescale_value. Returns True if the reset was skipped.
+        """
+        if not self.is_configured(prescale_value):
+            self.reset(prescale_value)
+            return False
+        # running at the right rate; leave the outputs alone
+        mode1 = self.regs.read(MODE1) & ~RESTART
+        if not mode1 & AI:
+            self.regs.write(MODE1, mode1 | AI)
+        return True
+
+    def is_configured(self, prescale_value):
+        """True if the chip is awake and running at prescale_value."""
+        # one read each of MODE1 and PRE_SCALE, e.g. after our control
+        # process restarts with the chip still powered and running
+        self.regs.invalidate()
+        if self.regs.read(MODE1) & SLEEP:
+            return False
+        return self.regs.read(PRE_SCALE) == prescale_value
+
+    def set_prescale(self, prescale_value):
+        """Change PRE_SCALE on a running chip, keeping the other MODE1 bits."""
+        # RESTART reads back as state, not as something we wrote
+        oldmode = self.regs.read(MODE1) & ~RESTART
+        # PRE_SCALE can only be set when MODE1.SLEEP = 1
+        self.regs.write(MODE1, oldmode | SLEEP)
+        self.regs.write(PRE_SCALE, prescale_value)
+        self.regs.write(MODE1, oldmode)
+        time.sleep(0.0005) # oscillator startup, 500us max
+        # writing 1 to RESTART resumes the PWM outputs; the bit self-clears
+        # so it is not kept in the shadow copy
+        self._write_byte(MODE1, oldmode | RESTART)
+        self.frame_origin = time.monotonic()
+
+    def set_pwm_freq(self, freq_hz, osc_clock=OSC_CLOCK):
+        """Set the PWM frequency to the provided value in hertz."""
+        self.set_prescale(round(osc_clock / (4096 * freq_hz)) - 1)
+
+    def write_regs(self, register, data):
+        """Write consecutive registers starting at register."""
+        if self.block_writes:
+            # one transaction per 32 bytes, relies on MODE1.AI
+            for i in range(0, len(data), I2C_BLOCK_MAX):
+                self._bus.write_i2c_block_data(self.address, register + i,
+                                               list(data[i:i + I2C_BLOCK_MAX]))
+        else:
+            for i, b in enumerate(data):
+                self._bus.write_byte_data(self.address, register + i, b)
+
+    def read_regs(self, register, length):
+        """Read consecutive registers starting at register."""
+        if self.block_writes:
+            out = []
+            for i in range(0, length, I2C_BLOCK_MAX):
+                out += self._bus.read_i2c_block_data(
+                    self.address, register + i, min(I2C_BLOCK_MAX, length - i))
+            return bytes(out)
+        return bytes(self._read_byte(register + i) for i in range(length))
+
+    def set_pwm(self, channel, on, off):
+        """Sets a single PWM channel."""
+        self.write_regs(CHAN_BASE_ADDR_ON_L + 4 * channel, chan_bytes(on, off))
+
+    def set_all_pwm(self, on, off):
+        """Sets all PWM channels."""
+        self.write_regs(ALL_LED_ON_L, chan_bytes(on, off))
+
+
+class FrameBuffer(object):
+    """In-memory image of the 64 channel registers, LED0_ON_L to LED15_OFF_H.
+
+    Channel setters only change the image, and only mark bytes dirty when
+    they actually change. flush() then sends the one contiguous dirty span
+    as an auto-increment block write, so a frame where nothing changed
+    costs no bus traffic at all.
+
+    set_pulse() starts each channel's pulse at its ON offset, staggered
+    across the cycle unless stagger is off (see stagger()); set_pwm()
+    takes ON as given, as PCA9685.set_pwm does.
+
+    The span can take in channels nobody set, so the image has to hold
+    what the chip already has: with load on, it is read back from the
+    chip (MODE1.AI must be set, i.e. after begin()); otherwise it starts
+    at the power-on default, every channel full off.
+    """
+
+    def __init__(self, pwm, stagger=True, load=True):
+        self.pwm = pwm
+        self.image = bytearray([0, 0, 0, CHAN_FULL] * NUM_CHANNELS)
+        # dirty byte range in the image, [lo, hi), empty when lo >= hi
+        self._mark_clean()
+        if load:
+            self.load()
+        # where in the 4096-count cycle each channel's pulse starts
+        self.offsets = [0] * NUM_CHANNELS
+        if stagger:
+            self.stagger()
+
+    def stagger(self, channels=None):
+        """Spread the ON offsets of channels evenly across the cycle.
+
+        With every channel at ON=0, all the servo pulses rise together and
+        the supply sees their currents stacked at the start of the frame;
+        staggered, the rising edges are spread out and the peak is lower.
+        Pulse widths are unchanged. Takes effect at the next set_pulse.
+        """
+        if channels is None:
+            channels = range(NUM_CHANNELS)
+        channels = list(channels)
+        step = (MAX_HIGH + 1) // len(channels)
+        for i, c in enumerate(channels):
+            self.offsets[c] = i * step
+
+    def _put(self, channel, data):
+        i = 4 * channel
+        if self.image[i:i + 4] == bytes(data):
+            return
+        self.image[i:i + 4] = bytes(data)
+        self._dirty_lo = min(self._dirty_lo, i)
+        self._dirty_hi = max(self._dirty_hi, i + 4)
+
+    def set_pwm(self, channel, on, off):
+        """Set a channel's ON and OFF counts in the image."""
+        self._put(channel, chan_bytes(on, off))
+
+    def set_pulse(self, channel, width):
+        """Pulse width counts long, starting at the channel's ON offset."""
+        if width <= 0:
+            self.set_full_off(channel)
+        elif width > MAX_HIGH:
+            self.set_full_on(channel)
+        else:
+            on = self.offsets[channel]
+            # OFF may wrap round below ON, the chip handles that: the
+            # output goes high at ON and low at OFF in the next cycle
+            self.set_pwm(channel, on, (on + width) % (MAX_HIGH + 1))
+
+    def get_pulse(self, channel):
+        """Pulse width of a channel, in counts, as held in the image."""
+        on, off = self.get_pwm(channel)
+        if off & (CHAN_FULL << 8):
+            return 0
+        if on & (CHAN_FULL << 8):
+            return MAX_HIGH + 1
+        return (off - on) % (MAX_HIGH + 1)
+
+    def set_full_on(self, channel):
+        """Set a channel full on; the OFF register is cleared so no conflict."""
+        self._put(channel, [0, CHAN_FULL, 0, 0])
+
+    def set_full_off(self, channel):
+        """Set a channel full off; the ON register is cleared so no conflict."""
+        self._put(channel, [0, 0, 0, CHAN_FULL])
+
+    def load(self):
+        """Read the channel registers back from the chip into the image."""
+        self.image[:] = self.pwm.read_regs(CHAN_BASE_ADDR_ON_L, len(self.image))
+        self._mark_clean()
+
+    def get_pwm(self, channel):
+        """(on, off) counts of a channel, as held in the image."""
+        i = 4 * channel
+        b = self.image
+        return (b[i] | (b[i + 1] << 8), b[i + 2] | (b[i + 3] << 8))
+
+    def is_dirty(self):
+        return self._dirty_lo < self._dirty_hi
+
+    def mark_all_dirty(self):
+        """Force the next flush to rewrite all 16 channels."""
+        self._dirty_lo = 0
+        self._dirty_hi = len(self.image)
+
+    def _mark_clean(self):
+        self._dirty_lo = len(self.image)
+        self._dirty_hi = 0
+
+    def assume_all(self, on, off, full_off=False):
+        """Record that every channel was set some other way, e.g. through
+        the ALL_LED registers, without marking anything dirty.
+        """
+        data = [0, 0, 0, CHAN_FULL] if full_off else chan_bytes(on, off)
+        self.image[:] = bytes(data) * NUM_CHANNELS
+        self._mark_clean()
+
+    def assume_channel(self, channel, data):
+        """Record the four register bytes a channel was sent some other
+        way, e.g. by a cached trajectory playback.
+        """
+        i = 4 * channel
+        self.image[i:i + 4] = bytes(data)
+
+    def take_dirty(self):
+        """(first register, bytes) of the changed span, now marked clean,
+        or None if nothing changed.
+        """
+        if not self.is_dirty():
+            return None
+        lo, hi = self._dirty_lo, self._dirty_hi
+        self._mark_clean()
+        return CHAN_BASE_ADDR_ON_L + lo, bytes(self.image[lo:hi])
+
+    def flush(self):
+        """Send the changed span to the chip. Returns bytes sent."""
+        span = self.take_dirty()
+        if span is None:
+            return 0
+        self.pwm.write_regs(*span)
+        return len(span[1])
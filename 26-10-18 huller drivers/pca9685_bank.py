@@ -0,0 +1,175 @@
+# a bank of PCA9685 boards on one I2C bus
+# boards are found by scanning the address range set by the A0-A5 jumpers,
+# as in "21-09-16 servo tests PCA9685 bonnet/test05 PCA9685.py", and their
+# channels are numbered consecutively, 16 per board, lowest address first
+# settings common to every board (MODE1, PRE_SCALE, all outputs off) go
+# out once, to the LED All Call address, instead of once per board
+
+import time
+
+from pca9685 import (PCA9685, FrameBuffer, PCA9685_ADDRESS, ALLCALL_ADDRESS,
+                     SUBADR_DEFAULTS, SUBADR1, ALLCALLADR, MODE1, PRE_SCALE,
+                     ALL_LED_ON_L, RESTART, AI, SLEEP, ALLCALL, SUB1, SUB2, SUB3,
+                     NUM_CHANNELS, CHAN_FULL)
+
+# an INA260 on the same bus also answers in 0x40-0x4F, tell it apart
+# by its manufacturer ID, read as a little-endian smbus word
+INA260_MFR_ID_REG = 0xFE
+INA260_MFR_ID_WORD = 0x4954 # 0x5449 byte swapped
+
+SUB_BITS = {1: SUB1, 2: SUB2, 3: SUB3}
+
+
+def discover(bus, exclude=()):
+    """Sorted list of addresses in 0x40-0x7F that answer like a PCA9685.
+
+    A board with SUBn or ALLCALL enabled in MODE1 also answers at that
+    sub or All Call address, e.g. after make_group(); those addresses are
+    read from the boards found and dropped, so a group isn't counted as
+    one more board.
+    """
+    found = []
+    shared = set()
+    for addr in range(PCA9685_ADDRESS, (PCA9685_ADDRESS | 0b00111111) + 1):
+        if addr == ALLCALL_ADDRESS: # skip ALLCALLADR
+            continue
+        if addr >= 0b01111110: # skip 'reserved for future use' range
+            continue
+        if addr in exclude:
+            continue
+        try:
+            mode1 = bus.read_byte_data(addr, MODE1)
+            if bus.read_word_data(addr, INA260_MFR_ID_REG) == INA260_MFR_ID_WORD:
+                continue # an INA260
+            # SUBADRn and ALLCALLADR hold the 8 bit form of the address
+            for sub, bit in SUB_BITS.items():
+                if mode1 & bit:
+                    shared.add(bus.read_byte_data(addr, SUBADR1 + sub - 1) >> 1)
+            if mode1 & ALLCALL:
+                shared.add(bus.read_byte_data(addr, ALLCALLADR) >> 1)
+        except OSError:
+            # nonexistent address: '[Errno 121] Remote I/O error'
+            continue
+        found.append(addr)
+    return [a for a in found if a not in shared]
+
+
+class PCA9685Bank(object):
+    """Several PCA9685 boards driven as one set of logical channels.
+
+    Logical channel n is channel n % 16 on the (n // 16)th board.
+    Writes to the ALLCALL address reach every board with MODE1.ALLCALL
+    set (the power-on default, and kept by PCA9685.reset), so they cost
+    one transaction however many boards there are. The chips can't be
+    read back at that address, so each board's shadow copy is updated
+    by assumption.
+    """
+
+    def __init__(self, bus, addresses=None, block_writes=True, stagger=True):
+        self._bus = bus
+        if addresses is None:
+            addresses = discover(bus)
+        self.boards = [PCA9685(bus, a, block_writes) for a in addresses]
+        # boards run off their own oscillators, so ON offsets are only
+        # staggered within each board
+        # loaded in begin(), once auto-increment is on
+        self.frames = [FrameBuffer(b, stagger, load=False) for b in self.boards]
+        # never read from this one, only written
+        self.allcall = PCA9685(bus, ALLCALL_ADDRESS, block_writes)
+
+    @property
+    def num_channels(self):
+        return NUM_CHANNELS * len(self.boards)
+
+    def locate(self, logical):
+        """(board index, channel) of a logical channel."""
+        if not 0 <= logical < self.num_channels:
+            raise IndexError("logical channel {0} out of range".format(logical))
+        return divmod(logical, NUM_CHANNELS)
+
+    def _broadcast_mode1(self, value):
+        self.allcall._write_byte(MODE1, value)
+        for b in self.boards:
+            b.regs.assume(MODE1, value)
+
+    def begin(self, prescale_value):
+        """Warm-start every board; if none are running, reset them all
+        with one set of broadcast writes.
+
+        Returns the number of boards that were already running.
+        """
+        cold = []
+        for b in self.boards:
+            if not b.is_configured(prescale_value):
+                cold.append(b)
+            else:
+                b.begin(prescale_value) # sets MODE1.AI if needed
+        if len(cold) > 1 and len(cold) == len(self.boards):
+            for b in cold:
+                # must answer ALLCALL for the broadcast to reach it
+                if not b.regs.read(MODE1) & ALLCALL:
+                    b.regs.update(MODE1, ALLCALL, ALLCALL)
+            self.set_prescale(prescale_value, wake_mode=AI | ALLCALL)
+        else:
+            # don't make boards that are running sleep for the others
+            for b in cold:
+                b.reset(prescale_value)
+        for f in self.frames:
+            f.load()
+        return len(self.boards) - len(cold)
+
+    def set_prescale(self, prescale_value, wake_mode=None):
+        """PRE_SCALE to every board in three broadcast writes."""
+        if wake_mode is None:
+            wake_mode = self.boards[0].regs.read(MODE1) & ~(RESTART | SLEEP)
+        # PRE_SCALE can only be set when MODE1.SLEEP = 1
+        self._broadcast_mode1(wake_mode | SLEEP)
+        self.allcall._write_byte(PRE_SCALE, prescale_value)
+        for b in self.boards:
+            b.regs.assume(PRE_SCALE, prescale_value)
+        self._broadcast_mode1(wake_mode)
+        time.sleep(0.0005) # oscillator startup, 500us max
+        self.allcall._write_byte(MODE1, wake_mode | RESTART)
+
+    def all_off(self):
+        """Every output on every board full off, in one block write."""
+        self.allcall.write_regs(ALL_LED_ON_L, [0, 0, 0, CHAN_FULL])
+        # ALL_LED registers load every LEDn register, so the chips now
+        # hold full off on all channels; make the images agree
+        for f in self.frames:
+            f.assume_all(0, 0, full_off=True)
+
+    def set_pwm(self, logical, on, off):
+        """Set a logical channel in its board's frame buffer."""
+        board, chan = self.locate(logical)
+        self.frames[board].set_pwm(chan, on, off)
+
+    def set_pulse(self, logical, width):
+        """Set a logical channel's pulse width, at its staggered ON offset."""
+        board, chan = self.locate(logical)
+        self.frames[board].set_pulse(chan, width)
+
+    def set_full_on(self, logical):
+        board, chan = self.locate(logical)
+        self.frames[board].set_full_on(chan)
+
+    def set_full_off(self, logical):
+        board, chan = self.locate(logical)
+        self.frames[board].set_full_off(chan)
+
+    def flush(self):
+        """Send each board's changed span. Returns total bytes sent."""
+        return sum(f.flush() for f in self.frames)
+
+    def make_group(self, indexes, sub=1, address=None):
+        """Program a SUBADR on some boards, and return a write-only
+        PCA9685 at that address for broadcasting to just that group.
+        """
+        if address is None:
+            address = SUBADR_DEFAULTS[sub]
+        for i in indexes:
+            b = self.boards[i]
+            # SUBADRn registers hold the 8 bit form of the address
+            b._write_byte(SUBADR1 + sub - 1, address << 1)
+            b.regs.update(MODE1, SUB_BITS[sub], SUB_BITS[sub])
+        return PCA9685(self._bus, address, self.allcall.block_writes)
@@ -0,0 +1,157 @@
+# deadline-based scheduler
+# the timing loops in the test scripts do their work and then
+# time.sleep(interval), so every period is interval plus however long the
+# I2C or GPIO calls took, and the drift adds up
+# here each task runs against absolute time.monotonic() deadlines,
+# start + n * period, and the scheduler keeps track of how late each run
+# started, so cycle times are repeatable and the margins can be measured
+
+# usage:
+#   sched = Scheduler()
+#   sched.every(1/50.0, servo_frame, "servo") # 50 Hz PWM frames
+#   sched.every(1/500.0, step, "stepper") # 28BYJ-48 steps, was sleep(0.002)
+#   sched.every(1/1000.0, sample, "ina260")
+#   sched.run(duration=10)
+#   sched.print_report()
+
+import heapq, itertools, math, time
+
+
+class TaskStats(object):
+    """Lateness, jitter and run time of one task."""
+
+    def __init__(self):
+        self.runs = 0
+        self.missed = 0 # whole periods skipped after an overrun
+        self.late_sum = 0.0
+        self.late_sq_sum = 0.0
+        self.late_max = 0.0
+        self.busy = 0.0 # seconds spent in the task
+
+    def record(self, lateness, run_time):
+        self.runs += 1
+        self.late_sum += lateness
+        self.late_sq_sum += lateness * lateness
+        self.late_max = max(self.late_max, lateness)
+        self.busy += run_time
+
+    def summary(self):
+        n = max(1, self.runs)
+        mean = self.late_sum / n
+        # jitter as the standard deviation of lateness
+        jitter = math.sqrt(max(0.0, self.late_sq_sum / n - mean * mean))
+        return {"runs": self.runs,
+                "missed": self.missed,
+                "late_mean_us": 1e6 * mean,
+                "late_max_us": 1e6 * self.late_max,
+                "jitter_us": 1e6 * jitter,
+                "run_mean_us": 1e6 * self.busy / n}
+
+
+class Task(object):
+    __slots__ = ("name", "fn", "args", "period", "deadline", "stats", "cancelled")
+
+    def __init__(self, name, fn, args, period, deadline):
+        self.name = name
+        self.fn = fn
+        self.args = args
+        self.period = period # None for a one-shot
+        self.deadline = deadline
+        self.stats = TaskStats()
+        self.cancelled = False
+
+    def cancel(self):
+        self.cancelled = True
+
+
+class Scheduler(object):
+    """Runs tasks at absolute monotonic deadlines, in one thread.
+
+    Sleeps until spin seconds before a deadline, then busy-waits the rest,
+    since time.sleep on the Pi can overshoot by a fair fraction of a ms.
+    A periodic task that overruns skips the periods it missed rather than
+    running them back to back; the skips are counted in its stats.
+    """
+
+    def __init__(self, spin=0.0002, clock=time.monotonic, sleep=time.sleep):
+        self.spin = spin
+        self.clock = clock
+        self.sleep = sleep
+        self._heap = []
+        self._seq = itertools.count()
+        self.tasks = []
+        self._stopped = False
+
+    def _push(self, task):
+        heapq.heappush(self._heap, (task.deadline, next(self._seq), task))
+
+    def every(self, period, fn, name=None, *args, start=None):
+        """Run fn(*args) every period seconds, first at start (default now).
+
+        If fn returns False the task stops repeating.
+        """
+        if start is None:
+            start = self.clock()
+        task = Task(name or fn.__name__, fn, args, period, start)
+        self.tasks.append(task)
+        self._push(task)
+        return task
+
+    def call_at(self, deadline, fn, name=None, *args):
+        """Run fn(*args) once, at monotonic time deadline."""
+        task = Task(name or fn.__name__, fn, args, None, deadline)
+        self.tasks.append(task)
+        self._push(task)
+        return task
+
+    def call_later(self, delay, fn, name=None, *args):
+        return self.call_at(self.clock() + delay, fn, name, *args)
+
+    def stop(self):
+        """Make run() return after the current task; callable from a task."""
+        self._stopped = True
+
+    def wait_until(self, deadline):
+        delay = deadline - self.clock() - self.spin
+        if delay > 0:
+            self.sleep(delay)
+        while self.clock() < deadline:
+            pass
+
+    def run(self, duration=None):
+        """Run tasks until stop(), no tasks are left, or duration passes."""
+        self._stopped = False
+        end = None if duration is None else self.clock() + duration
+        while self._heap and not self._stopped:
+            deadline, seq, task = heapq.heappop(self._heap)
+            if task.cancelled:
+                continue
+            if end is not None and deadline > end:
+                self._push(task) # still pending if run again
+                break
+            self.wait_until(deadline)
+            started = self.clock()
+            result = task.fn(*task.args)
+            finished = self.clock()
+            task.stats.record(started - deadline, finished - started)
+            if task.period is None or result is False or task.cancelled:
+                continue
+            task.deadline += task.period
+            if task.deadline < finished:
+                # overran; skip to the next period still in the future
+                skipped = int((finished - task.deadline) / task.period) + 1
+                task.stats.missed += skipped
+                task.deadline += skipped * task.period
+            self._push(task)
+
+    def report(self):
+        """{task name: stats summary}."""
+        return {t.name: t.stats.summary() for t in self.tasks}
+
+    def print_report(self):
+        print("{0:<12}{1:>8}{2:>8}{3:>12}{4:>12}{5:>12}{6:>12}".format(
+            "task", "runs", "missed", "late us", "max us", "jitter us", "run us"))
+        for name, s in self.report().items():
+            print("{0:<12}{1:>8}{2:>8}{3:>12.1f}{4:>12.1f}{5:>12.1f}{6:>12.1f}".format(
+                name, s["runs"], s["missed"], s["late_mean_us"],
+                s["late_max_us"], s["jitter_us"], s["run_mean_us"]))
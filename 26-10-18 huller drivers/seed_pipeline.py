@@ -0,0 +1,170 @@
+# pipelined seed-handling cycle
+# one seed goes through: vibrate (DRV8601 buzzer shakes a seed into
+# place), rise (servo lifts it), dwell (at the top while it is taken),
+# return (servo back down). Run one after another that is four phases per
+# seed, but the buzzer is free as soon as the lifter has picked its seed
+# up, so the next seed's vibration can run during this seed's dwell and
+# return stroke.
+# The cycle is written as a phase graph: each phase names the phases it
+# has to wait for, in this seed or the one before, and the resource it
+# holds (servo, buzzer). The pipeline starts every phase as soon as its
+# dependencies are done and its resource is free, on a Scheduler.
+
+# usage:
+#   pipe = Pipeline(sched, seed_cycle(...), n_seeds=20)
+#   pipe.start()
+#   sched.run()
+#   print(pipe.report())
+
+from coordinated_motion import CoordinatedMove
+
+
+class Phase(object):
+    """One phase of a seed cycle.
+
+    after is a list of (phase name, seed offset): offset 0 is this seed,
+    -1 the seed before. start(done) begins the phase; with a duration,
+    the pipeline finishes it that many seconds later, otherwise start
+    must call done() itself, e.g. when a servo move ends. finish() runs
+    as the phase completes.
+    """
+
+    def __init__(self, name, resource=None, after=(), start=None,
+                 duration=None, finish=None):
+        self.name = name
+        self.resource = resource
+        self.after = list(after)
+        self.start = start
+        self.duration = duration
+        self.finish = finish
+
+
+class _Node(object):
+    __slots__ = ("phase", "seed", "deps", "started", "ended")
+
+    def __init__(self, phase, seed):
+        self.phase = phase
+        self.seed = seed
+        self.deps = []
+        self.started = None
+        self.ended = None
+
+
+class Pipeline(object):
+    """Runs n_seeds copies of a phase graph, overlapping where allowed."""
+
+    def __init__(self, sched, phases, n_seeds, on_done=None):
+        self.sched = sched
+        self.n_seeds = n_seeds
+        self.on_done = on_done
+        self.nodes = []
+        index = {}
+        for k in range(n_seeds):
+            for p in phases:
+                node = _Node(p, k)
+                index[(p.name, k)] = node
+                self.nodes.append(node)
+        for node in self.nodes:
+            for name, offset in node.phase.after:
+                dep = index.get((name, node.seed + offset))
+                if dep is not None: # seed -1 doesn't exist
+                    node.deps.append(dep)
+        self._busy = set() # resources held
+        self.t0 = None
+
+    def start(self):
+        self.t0 = self.sched.clock()
+        self._start_ready()
+
+    def _start_ready(self):
+        for node in self.nodes:
+            if node.started is not None:
+                continue
+            r = node.phase.resource
+            if r is not None and r in self._busy:
+                continue
+            if all(d.ended is not None for d in node.deps):
+                self._begin(node)
+
+    def _begin(self, node):
+        node.started = self.sched.clock()
+        p = node.phase
+        if p.resource is not None:
+            self._busy.add(p.resource)
+        done = lambda: self._complete(node)
+        if p.start is not None:
+            p.start(done)
+        if p.duration is not None:
+            d = p.duration() if callable(p.duration) else p.duration
+            self.sched.call_later(d, done, "{0} {1}".format(p.name, node.seed))
+        elif p.start is None:
+            self._complete(node)
+
+    def _complete(self, node):
+        if node.ended is not None:
+            return
+        node.ended = self.sched.clock()
+        p = node.phase
+        if p.finish is not None:
+            p.finish()
+        if p.resource is not None:
+            self._busy.discard(p.resource)
+        if all(n.ended is not None for n in self.nodes):
+            if self.on_done is not None:
+                self.on_done(self)
+            return
+        self._start_ready()
+
+    @property
+    def done(self):
+        return all(n.ended is not None for n in self.nodes)
+
+    def report(self):
+        """Total time, seeds per minute, and mean time of each phase."""
+        end = max(n.ended for n in self.nodes)
+        total = end - self.t0
+        r = {"seeds": self.n_seeds, "total_s": total,
+             "seeds_per_min": 60.0 * self.n_seeds / total if total else 0.0}
+        for name in dict.fromkeys(n.phase.name for n in self.nodes):
+            spans = [n.ended - n.started for n in self.nodes if n.phase.name == name]
+            r[name + "_mean_ms"] = 1e3 * sum(spans) / len(spans)
+        return r
+
+
+def seed_cycle(frame, sync, up, down, servo_channel=0, buzzer=(1, 2, 3),
+               vibrate_s=0.3, dwell_s=0.2, pipelined=True):
+    """Phases of one seed on a lifter servo and DRV8601 buzzer.
+
+    up and down are pulse-count trajectories, played one point per PWM
+    frame through sync (a FrameSync); buzzer is the EN, IN1, IN2 channels.
+    With pipelined off, the next seed's vibration waits for this seed's
+    return, as separate scripts run back to back would.
+    """
+    en, in1, in2 = buzzer
+
+    def stroke(trajectory):
+        def start(done):
+            move = CoordinatedMove(frame, {servo_channel: trajectory})
+            def finished(m):
+                m.detach(sync)
+                done()
+            move.on_done = finished
+            move.attach(sync)
+        return start
+
+    def buzz_on(done):
+        frame.set_full_on(in1)
+        frame.set_full_off(in2)
+        frame.set_full_on(en)
+
+    def buzz_off():
+        frame.set_full_off(en)
+
+    # the buzzer may start on the next seed once this one is lifted
+    vibrate_after = [("rise", -1)] if pipelined else [("return", -1)]
+    return [
+        Phase("vibrate", "buzzer", vibrate_after, buzz_on, vibrate_s, buzz_off),
+        Phase("rise", "servo", [("vibrate", 0), ("return", -1)], stroke(up)),
+        Phase("dwell", "servo", [("rise", 0)], None, dwell_s),
+        Phase("return", "servo", [("dwell", 0)], stroke(down)),
+    ]
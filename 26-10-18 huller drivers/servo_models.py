@@ -0,0 +1,93 @@
+# servo models and angle to pulse conversion
+# servo limits have been magic numbers in each script:
+#   HXT900, "07 HXT900 lift seed.py": 103 to 483 counts at 50Hz
+#   HK-5330S, "04 test_50Hz.py" and "05 HK-5330S lift seed.py": 162 to 464
+#   GPIO scripts: duty = angle / 18 + 2, percent at 50Hz
+#   test02.py: servo_min=150, servo_max=600 at 60Hz
+# here each model keeps its calibration points as (angle, pulse ms), which
+# don't depend on frame rate, and whole arrays of angles are converted to
+# PCA9685 counts or GPIO duty cycles in one NumPy call
+
+# usage:
+#   hxt = get_model("HXT900")
+#   counts = hxt.to_counts(np.linspace(0, 180, 50), frame_rate=50)
+#   duty = get_model("generic").to_duty(90, frame_rate=50)
+
+import numpy as np
+
+from osc_calibration import COUNTS_PER_FRAME
+
+# one PCA9685 count at a true 50Hz, in ms (0x7C prescale, measured)
+_MS_PER_COUNT_50HZ = 20.0 / COUNTS_PER_FRAME
+
+
+class ServoModel(object):
+    """A servo type, calibrated as pulse width against angle.
+
+    Between points the pulse is interpolated linearly; outside them it is
+    held at the end points, so a bad angle can't drive past the limits.
+    """
+
+    def __init__(self, name, points):
+        self.name = name
+        points = sorted(points)
+        self.angles = np.array([a for a, ms in points], dtype=float)
+        self.pulses_ms = np.array([ms for a, ms in points], dtype=float)
+
+    @property
+    def min_angle(self):
+        return float(self.angles[0])
+
+    @property
+    def max_angle(self):
+        return float(self.angles[-1])
+
+    def to_ms(self, angles):
+        """Pulse width, ms, for an angle or array of angles."""
+        return np.interp(angles, self.angles, self.pulses_ms)
+
+    def to_counts(self, angles, frame_rate):
+        """PCA9685 OFF counts (with ON=0) at frame_rate Hz, as uint16."""
+        counts = self.to_ms(angles) * frame_rate * COUNTS_PER_FRAME / 1000.0
+        return np.rint(np.clip(counts, 0, COUNTS_PER_FRAME - 1)).astype(np.uint16)
+
+    def to_duty(self, angles, frame_rate=50):
+        """RPi.GPIO ChangeDutyCycle percent at frame_rate Hz."""
+        return self.to_ms(angles) * frame_rate / 10.0
+
+    def from_counts(self, counts, frame_rate):
+        """Angles for PCA9685 counts, the inverse of to_counts."""
+        ms = np.asarray(counts, dtype=float) * 1000.0 / (frame_rate * COUNTS_PER_FRAME)
+        return np.interp(ms, self.pulses_ms, self.angles)
+
+    def count_limits(self, frame_rate):
+        """(min, max) counts over the calibrated travel."""
+        c = self.to_counts(self.angles[[0, -1]], frame_rate)
+        return int(c.min()), int(c.max())
+
+
+_registry = {}
+
+def register(model):
+    _registry[model.name] = model
+    return model
+
+def get_model(name):
+    try:
+        return _registry[name]
+    except KeyError:
+        raise KeyError("unknown servo model {0}, have {1}".format(
+            name, ", ".join(sorted(_registry))))
+
+def model_names():
+    return sorted(_registry)
+
+
+# limits found in the lift-seed scripts, taken as the ends of a nominal
+# 180 degree travel
+register(ServoModel("HXT900", [(0, 103 * _MS_PER_COUNT_50HZ),
+                               (180, 483 * _MS_PER_COUNT_50HZ)]))
+register(ServoModel("HK-5330S", [(0, 162 * _MS_PER_COUNT_50HZ),
+                                 (180, 464 * _MS_PER_COUNT_50HZ)]))
+# duty = angle / 18 + 2 percent of 20 ms, from the GPIO servo tests
+register(ServoModel("generic", [(0, 0.4), (180, 2.4)]))
@@ -0,0 +1,56 @@
+# write-through shadow cache of device configuration registers
+# configuration registers only change when we write them, so after the
+# first read, read-modify-write operations can take the current value
+# from memory and skip a full I2C round trip
+# if the chip may have been reset behind our back (brownout, power cycle,
+# another process), call resync() to re-read everything from the bus
+
+class ShadowRegisters(object):
+    """Cached copies of a fixed set of registers on one device.
+
+    read_fn(register) and write_fn(register, value) do the actual bus
+    access, so the same cache works for byte-wide PCA9685 registers and
+    16-bit INA260 words.
+    """
+
+    def __init__(self, read_fn, write_fn, registers):
+        self._read_fn = read_fn
+        self._write_fn = write_fn
+        self.registers = tuple(registers)
+        self._cache = {}
+
+    def read(self, register):
+        """Cached value, read from the bus only the first time."""
+        if register not in self._cache:
+            self._cache[register] = self._read_fn(register)
+        return self._cache[register]
+
+    def write(self, register, value):
+        """Write to the bus and remember the value."""
+        self._write_fn(register, value)
+        self._cache[register] = value
+
+    def assume(self, register, value):
+        """Record a value that reached the chip some other way, e.g. a
+        write to the ALLCALL address, without touching the bus.
+        """
+        self._cache[register] = value
+
+    def update(self, register, mask, bits):
+        """Read-modify-write the bits under mask, without a bus read."""
+        value = (self.read(register) & ~mask) | (bits & mask)
+        self.write(register, value)
+        return value
+
+    def invalidate(self, register=None):
+        """Forget one register, or all of them; next read goes to the bus."""
+        if register is None:
+            self._cache.clear()
+        else:
+            self._cache.pop(register, None)
+
+    def resync(self):
+        """Re-read every shadowed register from the chip."""
+        self._cache.clear()
+        for register in self.registers:
+            self.read(register)
@@ -0,0 +1,34 @@
+# moves a HXT900 servo motor through its position limits, like
+# "21-11-20 seed picker tests/07 HXT900 lift seed.py", but using the
+# shared PCA9685 driver
+# each step is one 4-byte auto-increment block write instead of
+# separate ON/OFF register writes
+
+import smbus, time
+from pca9685 import PCA9685
+
+# For 50Hz, calculation gives 0x78, but emperically 0x7C is more
+# accurate.
+prescale_value = 0x7C
+
+i2c_bus = smbus.SMBus(1) # Create a new I2C bus
+pwm = PCA9685(i2c_bus)
+pwm.begin(prescale_value) # skips the reset if already running
+
+clockwise_limit = 103 # actual limit 101
+counterclockwise_limit = 483 # actual limit 485
+position_step = 4
+time_step = 0.05
+while(1):
+    # step up
+    for time_high in range (clockwise_limit, counterclockwise_limit, position_step):
+        pwm.set_pwm(0, 0, time_high)
+        time.sleep(time_step)
+    pwm.set_pwm(0, 0, counterclockwise_limit)
+    time.sleep(time_step)
+    # step down
+    for time_high in range (counterclockwise_limit, clockwise_limit, -position_step):
+        pwm.set_pwm(0, 0, time_high)
+        time.sleep(time_step)
+    pwm.set_pwm(0, 0, clockwise_limit)
+    time.sleep(time_step)
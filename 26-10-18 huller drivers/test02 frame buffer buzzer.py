@@ -0,0 +1,55 @@
+# Buzzer motor control through the DRV8601 haptic driver, like
+# "21-11-27 buzzer tests/03 manual control.py", but the three control
+# lines are set in a frame buffer and sent to the PCA9685 with one
+# block write per change, instead of two or three write_word_data calls
+# per channel every time round the loop
+
+# Channel  DRV8601 pin
+#    01       EN
+#    02       IN1
+#    03       IN2
+
+# On startup, goes to all lines low
+# enter "x" to explicitly end
+
+import smbus
+from pca9685 import PCA9685, FrameBuffer
+
+# key is the code for which signal to control
+# val[0] is the channel number, val[1] is the state, 0 off 1 on
+toggle_dict = {"en": [1, 0],
+             "in1": [2, 0],
+             "in2": [3, 0]}
+
+prescale_value = 0x03 # max, 1525 Hz
+
+i2c_bus = smbus.SMBus(1) # Create a new I2C bus
+pwm = PCA9685(i2c_bus)
+pwm.begin(prescale_value) # skips the reset if already running
+frame = FrameBuffer(pwm)
+frame.mark_all_dirty() # first flush writes every channel
+
+while (1):
+    for key in sorted(toggle_dict):
+        chan_num, chan_state = toggle_dict[key]
+        print(key.upper(), "channel", chan_num, "is", ("off", "on")[chan_state])
+        if chan_state:
+            frame.set_full_on(chan_num)
+        else:
+            frame.set_full_off(chan_num)
+    print("bytes sent", frame.flush())
+    print() # blank line for readablilty
+
+    s = input('Line to toggle ').strip().lower()
+    if s == "x":
+        break
+    if s in toggle_dict.keys():
+        toggle_dict[s][1] ^= 1
+    elif s == "<>": # reverse the motor
+        if toggle_dict["en"][1] and toggle_dict["in1"][1] != toggle_dict["in2"][1]:
+            toggle_dict["in1"][1] ^= 1
+            toggle_dict["in2"][1] ^= 1
+        else:
+            print("motor not enabled, or inputs not configured")
+    else:
+        print("unrecognized input")
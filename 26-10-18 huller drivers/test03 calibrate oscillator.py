@@ -0,0 +1,30 @@
+# calibrate the PCA9685 oscillator of one board
+# runs channel 0 at a nominal 50Hz, asks for the frame rate as measured
+# with a scope, and saves the effective oscillator to pca9685_cal.json
+# later scripts can then compute PRE_SCALE and pulse counts instead of
+# hard-coding 0x7C
+
+import smbus
+from pca9685 import PCA9685, PCA9685_ADDRESS
+from osc_calibration import OscCalibration
+
+DESIRED_FREQUENCY  = 50 # in Hz
+
+i2c_bus = smbus.SMBus(1) # Create a new I2C bus
+cal = OscCalibration(PCA9685_ADDRESS)
+print("current oscillator estimate", cal.osc_clock)
+
+prescale_value = cal.prescale(DESIRED_FREQUENCY)
+print("prescale value", hex(prescale_value))
+pwm = PCA9685(i2c_bus)
+pwm.begin(prescale_value)
+# half duty, easy to trigger on
+pwm.set_pwm(0, 0, 2048)
+
+s = input('measured frame rate, Hz (blank to quit) --> ').strip()
+if s:
+    osc = cal.calibrate_frequency(prescale_value, float(s))
+    print("effective oscillator", round(osc), "Hz, saved")
+    print("prescale for", DESIRED_FREQUENCY, "Hz now", hex(cal.prescale(DESIRED_FREQUENCY)))
+    print("1.0, 1.5, 2.0 ms pulses",
+          cal.pulse_count_table([1.0, 1.5, 2.0], cal.prescale(DESIRED_FREQUENCY)))
@@ -0,0 +1,35 @@
+# runs one HXT900 seed-lift sweep and a few INA260 reads against the
+# in-process fake bus, no Raspberry Pi needed
+# prints what the bus saw
+
+import math
+from fake_smbus import FakeSMBus, FakePCA9685, FakeINA260
+from pca9685 import PCA9685
+from ina260 import INA260
+
+prescale_value = 0x7C
+
+pca = FakePCA9685(0x40)
+# servo drawing about 300 mA, with a 50Hz ripple
+ina = FakeINA260(0x45, current_fn=lambda t: 300 + 100 * math.sin(2 * math.pi * 50 * t))
+i2c_bus = FakeSMBus([pca, ina])
+
+pwm = PCA9685(i2c_bus)
+pwm.begin(prescale_value)
+print("frame period, s", pca.frame_period())
+
+clockwise_limit = 103
+counterclockwise_limit = 483
+position_step = 4
+for time_high in range (clockwise_limit, counterclockwise_limit, position_step):
+    pwm.set_pwm(0, 0, time_high)
+print("channel 0 on, off", pca.channel(0))
+
+monitor = INA260(i2c_bus)
+print("manufacturer ID", hex(monitor.mfr_id()))
+print("current, raw", monitor.read_current())
+
+print("transactions", i2c_bus.transactions)
+print("bytes on the wire", i2c_bus.wire_bytes)
+print("bus time at 100kHz, s", i2c_bus.bus_time(100000))
+print("bus time at 400kHz, s", i2c_bus.bus_time(400000))
@@ -0,0 +1,47 @@
+# servo_current.py as it was meant to be: sweep the servo while
+# sampling the current through it
+# the sweep and the sampler run in their own threads, and share the
+# I2C bus through a single bus worker thread
+
+# runs on the fake bus unless REAL_BUS is set
+
+import threading, time
+from bus_worker import BusWorker, PRIORITY_HIGH, PRIORITY_NORMAL, is_channel_register
+from pca9685 import PCA9685
+from ina260 import INA260
+
+REAL_BUS = False
+
+if REAL_BUS:
+    import smbus
+    i2c_bus = smbus.SMBus(1) # Create a new I2C bus
+else:
+    from fake_smbus import FakeSMBus, FakePCA9685, FakeINA260
+    i2c_bus = FakeSMBus([FakePCA9685(0x40),
+                         FakeINA260(0x45, current_fn=lambda t: 250.0)])
+
+worker = BusWorker(i2c_bus).start()
+pwm = PCA9685(worker.proxy(PRIORITY_HIGH, coalesce=is_channel_register))
+pwm.begin(0x7C)
+monitor = INA260(worker.proxy(PRIORITY_NORMAL))
+done = threading.Event()
+
+def sweep():
+    for time_high in list(range(103, 483, 4)) + list(range(483, 103, -4)):
+        pwm.set_pwm(0, 0, time_high)
+        time.sleep(0.01)
+    done.set()
+
+samples = []
+def sample():
+    while not done.is_set():
+        samples.append(monitor.read_current())
+
+threads = [threading.Thread(target=sweep), threading.Thread(target=sample)]
+for t in threads:
+    t.start()
+for t in threads:
+    t.join()
+worker.stop()
+print("current samples", len(samples), "last", samples[-1] if samples else None)
+print("transactions", worker.executed, "coalesced", worker.coalesced)
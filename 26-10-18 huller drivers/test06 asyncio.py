@@ -0,0 +1,56 @@
+# one asyncio event loop driving a servo sweep, a buzzer pattern and
+# INA260 current sampling at the same time, each its own coroutine
+# servo on channel 0, DRV8601 EN/IN1/IN2 on channels 1-3
+
+# runs on the fake bus unless REAL_BUS is set
+
+import asyncio
+from async_drivers import AsyncBus, AsyncPCA9685, AsyncINA260
+
+REAL_BUS = False
+
+if REAL_BUS:
+    import smbus
+    i2c_bus = smbus.SMBus(1) # Create a new I2C bus
+else:
+    from fake_smbus import FakeSMBus, FakePCA9685, FakeINA260
+    i2c_bus = FakeSMBus([FakePCA9685(0x40),
+                         FakeINA260(0x45, current_fn=lambda t: 250.0)])
+
+abus = AsyncBus(i2c_bus)
+pwm = AsyncPCA9685(abus)
+monitor = AsyncINA260(abus)
+
+async def sweep():
+    for time_high in list(range(103, 483, 4)) + list(range(483, 103, -4)):
+        pwm.frame.set_pulse(0, time_high)
+        await pwm.flush()
+        await asyncio.sleep(0.01)
+
+async def buzz():
+    pwm.frame.set_full_on(1) # EN
+    for i in range(10):
+        # reverse the motor every 0.1 s
+        pwm.frame.set_full_on(2 + i % 2)
+        pwm.frame.set_full_off(3 - i % 2)
+        await pwm.flush()
+        await asyncio.sleep(0.1)
+    pwm.frame.set_full_off(1)
+    await pwm.flush()
+
+async def sample(samples):
+    while True:
+        samples.append(await monitor.read_current())
+        await asyncio.sleep(0.001)
+
+async def main():
+    await pwm.begin(0x7C)
+    print("manufacturer ID", hex(await monitor.mfr_id()))
+    samples = []
+    sampler = asyncio.ensure_future(sample(samples))
+    await asyncio.gather(sweep(), buzz())
+    sampler.cancel()
+    print("current samples", len(samples), "last", samples[-1])
+
+asyncio.run(main())
+abus.close()
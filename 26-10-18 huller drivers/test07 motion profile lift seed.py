@@ -0,0 +1,32 @@
+# HXT900 seed lift, like "21-11-20 seed picker tests/07 HXT900 lift seed.py",
+# but each stroke follows a motion profile, one position per PWM frame,
+# instead of fixed steps of 4 every 0.05 s
+
+import smbus
+from pca9685 import PCA9685, FrameBuffer
+from osc_calibration import OscCalibration
+from motion_profile import profile, play, SCURVE
+
+prescale_value = 0x7C
+clockwise_limit = 103 # actual limit 101
+counterclockwise_limit = 483 # actual limit 485
+max_velocity = 2000 # counts per second
+max_acceleration = 20000 # counts per second^2
+kind = SCURVE # or TRAPEZOID
+
+i2c_bus = smbus.SMBus(1) # Create a new I2C bus
+pwm = PCA9685(i2c_bus)
+pwm.begin(prescale_value)
+frame = FrameBuffer(pwm)
+frame_period = OscCalibration(pwm.address).frame_period(prescale_value)
+frame_rate = 1.0 / frame_period
+
+up = profile(clockwise_limit, counterclockwise_limit,
+             max_velocity, max_acceleration, frame_rate, kind)
+down = profile(counterclockwise_limit, clockwise_limit,
+               max_velocity, max_acceleration, frame_rate, kind)
+print("stroke", len(up), "frames,", round(len(up) * frame_period, 3), "s")
+
+while(1):
+    play(frame, 0, up, frame_period)
+    play(frame, 0, down, frame_period)
@@ -0,0 +1,40 @@
+# 50 Hz servo frames and 1 kHz INA260 current samples, run by the
+# deadline scheduler instead of work-then-sleep loops, with a report of
+# how late each task started
+
+# runs on the fake bus unless REAL_BUS is set
+
+from scheduler import Scheduler
+from pca9685 import PCA9685, FrameBuffer
+from ina260 import INA260
+
+REAL_BUS = False
+
+if REAL_BUS:
+    import smbus
+    i2c_bus = smbus.SMBus(1) # Create a new I2C bus
+else:
+    from fake_smbus import FakeSMBus, FakePCA9685, FakeINA260
+    i2c_bus = FakeSMBus([FakePCA9685(0x40), FakeINA260(0x45)])
+
+pwm = PCA9685(i2c_bus)
+pwm.begin(0x7C)
+frame = FrameBuffer(pwm)
+monitor = INA260(i2c_bus)
+
+positions = list(range(103, 483, 4)) + list(range(483, 103, -4))
+step = [0]
+def servo_frame():
+    frame.set_pulse(0, positions[step[0] % len(positions)])
+    frame.flush()
+    step[0] += 1
+
+samples = []
+def sample():
+    samples.append(monitor.read_current())
+
+sched = Scheduler()
+sched.every(1 / 50.0, servo_frame, "servo")
+sched.every(1 / 1000.0, sample, "ina260")
+sched.run(duration=2.0)
+sched.print_report()
@@ -0,0 +1,40 @@
+# sweep like "21-11-20 seed picker tests/02 test_50Hz.py", but the sweep
+# only sets the position, and the frame sync task sends it to the chip
+# once per 50Hz PWM frame
+
+# runs on the fake bus unless REAL_BUS is set
+
+from scheduler import Scheduler
+from frame_sync import FrameSync
+from pca9685 import PCA9685, FrameBuffer
+
+REAL_BUS = False
+
+if REAL_BUS:
+    import smbus
+    i2c_bus = smbus.SMBus(1) # Create a new I2C bus
+else:
+    from fake_smbus import FakeSMBus, FakePCA9685
+    i2c_bus = FakeSMBus([FakePCA9685(0x40)])
+
+pwm = PCA9685(i2c_bus)
+pwm.begin(0x7C)
+frame = FrameBuffer(pwm)
+sched = Scheduler()
+sync = FrameSync(frame, channels=[0]) # write away from the servo pulse start
+sync.attach(sched)
+print("frame period, s", sync.period)
+
+# the sweep itself can run at any rate, faster than the frames here;
+# the chip still only gets one write per frame
+positions = list(range(162, 464, 2)) + list(range(464, 162, -2))
+step = [0]
+def sweep():
+    frame.set_pulse(0, positions[step[0] % len(positions)])
+    step[0] += 1
+sched.every(0.005, sweep, "sweep")
+
+sched.run(duration=2.0)
+sched.print_report()
+print("frames", sync.frames, "flushes", sync.flushes,
+      "sweep steps", step[0], "transactions", i2c_bus.transactions)
@@ -0,0 +1,40 @@
+# three HXT900 seed lifters on channels 0-2 of one PCA9685, lifting
+# together; each PWM frame all three positions go out in one burst
+
+# runs on the fake bus unless REAL_BUS is set
+
+from pca9685 import PCA9685, FrameBuffer
+from servo_models import get_model
+from trajectory_cache import TrajectoryCache
+from coordinated_motion import CoordinatedMove, STRETCH
+from motion_profile import SCURVE
+
+REAL_BUS = False
+
+if REAL_BUS:
+    import smbus
+    i2c_bus = smbus.SMBus(1) # Create a new I2C bus
+else:
+    from fake_smbus import FakeSMBus, FakePCA9685
+    i2c_bus = FakeSMBus([FakePCA9685(0x40)])
+
+prescale_value = 0x7C
+frame_rate = 50.0
+lifter_channels = [0, 1, 2]
+
+pwm = PCA9685(i2c_bus)
+pwm.begin(prescale_value)
+frame = FrameBuffer(pwm) # ON offsets staggered
+hxt = get_model("HXT900")
+low, high = hxt.count_limits(frame_rate)
+cache = TrajectoryCache()
+up = cache.get(hxt.name, low, high, SCURVE, frame_rate).positions
+down = cache.get(hxt.name, high, low, SCURVE, frame_rate).positions
+
+i2c_bus_start = getattr(i2c_bus, "transactions", 0)
+for stroke in (up, down):
+    move = CoordinatedMove(frame, {c: stroke for c in lifter_channels}, STRETCH)
+    move.play(1.0 / frame_rate)
+    print("stroke of", len(move), "frames")
+if not REAL_BUS:
+    print("transactions", i2c_bus.transactions - i2c_bus_start)
@@ -0,0 +1,47 @@
+# seed cycle with the buzzer and lifter servo combined: the next seed's
+# vibration overlaps this seed's dwell and return stroke
+# runs the same number of seeds pipelined and then strictly one after
+# another, and prints seeds per minute for each
+
+# runs on the fake bus unless REAL_BUS is set
+
+from scheduler import Scheduler
+from frame_sync import FrameSync
+from pca9685 import PCA9685, FrameBuffer
+from servo_models import get_model
+from trajectory_cache import TrajectoryCache
+from motion_profile import SCURVE
+from seed_pipeline import Pipeline, seed_cycle
+
+REAL_BUS = False
+N_SEEDS = 5
+
+if REAL_BUS:
+    import smbus
+    i2c_bus = smbus.SMBus(1) # Create a new I2C bus
+else:
+    from fake_smbus import FakeSMBus, FakePCA9685
+    i2c_bus = FakeSMBus([FakePCA9685(0x40)])
+
+pwm = PCA9685(i2c_bus)
+pwm.begin(0x7C)
+frame = FrameBuffer(pwm)
+
+hxt = get_model("HXT900")
+low, high = hxt.count_limits(50.0)
+cache = TrajectoryCache()
+up = cache.get(hxt.name, low, high, SCURVE, 50.0).positions
+down = cache.get(hxt.name, high, low, SCURVE, 50.0).positions
+
+for pipelined in (True, False):
+    sched = Scheduler()
+    sync = FrameSync(frame, channels=[0]) # the buzzer lines are full on/off
+    sync.attach(sched)
+    pipe = Pipeline(sched, seed_cycle(frame, sync, up, down, pipelined=pipelined),
+                    N_SEEDS, on_done=lambda p: sched.stop())
+    pipe.start()
+    sched.run()
+    r = pipe.report()
+    print("pipelined" if pipelined else "sequential",
+          "{0:.1f} seeds/min, {1:.2f} s for {2} seeds".format(
+              r["seeds_per_min"], r["total_s"], r["seeds"]))
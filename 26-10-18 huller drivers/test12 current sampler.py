@@ -0,0 +1,43 @@
+# INA260 current, voltage and power streamed into a ring buffer by a
+# background thread while the main thread sweeps the servo; the samples
+# are looked at afterwards instead of printed as they come in
+# servo on channel 0
+
+# runs on the fake bus unless REAL_BUS is set
+
+import time
+
+import numpy as np
+
+from pca9685 import PCA9685
+from ina260 import INA260
+from ina260_decode import to_units
+from ina260_sampler import INA260Sampler, CURRENT, BUS_VOLTAGE, POWER
+
+REAL_BUS = False
+
+if REAL_BUS:
+    import smbus
+    i2c_bus = smbus.SMBus(1) # Create a new I2C bus
+else:
+    from fake_smbus import FakeSMBus, FakePCA9685, FakeINA260
+    i2c_bus = FakeSMBus([FakePCA9685(0x40),
+                         FakeINA260(0x45, current_fn=lambda t: 250.0)])
+
+pwm = PCA9685(i2c_bus)
+pwm.begin(0x7C)
+sampler = INA260Sampler(INA260(i2c_bus), capacity=10000,
+                        columns=(CURRENT, BUS_VOLTAGE, POWER), period=0.001)
+sampler.start()
+
+for time_high in list(range(103, 483, 4)) + list(range(483, 103, -4)):
+    pwm.set_pwm(0, 0, time_high)
+    time.sleep(0.01)
+
+sampler.stop()
+ts, values = sampler.ring.latest(sampler.ring.capacity)
+current, voltage, power = to_units(values, sampler.columns)
+print("samples", sampler.ring.count, "over", round(ts[-1] - ts[0], 3), "s")
+print("current mean", round(float(current.mean()), 1), "mA, peak",
+      round(float(np.abs(current).max()), 1), "mA")
+print("bus voltage", voltage[-1], "mV, power", power[-1], "mW")
@@ -0,0 +1,54 @@
+# INA260 current read once per conversion, off the ALERT pin, next to a
+# polling loop reading as fast as it can for the same time; the polled
+# samples are mostly repeats of the same conversion
+# INA260 ALERT wired to GPIO 24 (pin 18)
+
+# runs on the fake bus and a fake GPIO unless REAL_BUS is set
+
+import time
+
+import numpy as np
+
+from ina260 import INA260, CURRENT_LSB
+from ina260_sampler import INA260Sampler, AlertSampler
+
+REAL_BUS = False
+ALERT_PIN = 24
+
+if REAL_BUS:
+    import smbus
+    import RPi.GPIO as GPIO
+    i2c_bus = smbus.SMBus(1) # Create a new I2C bus
+else:
+    from fake_smbus import FakeSMBus, FakeINA260, FakeGPIO
+    # a 0.5 Hz sine on 300 mA
+    ina_model = FakeINA260(0x45, current_fn=lambda t: 300.0 + 50.0 * np.sin(np.pi * t))
+    i2c_bus = FakeSMBus([ina_model])
+    GPIO = FakeGPIO()
+    GPIO.connect(ALERT_PIN, ina_model.alert_pin, ina_model.alert_edges)
+
+GPIO.setmode(GPIO.BCM)
+ina = INA260(i2c_bus)
+
+def distinct(ring):
+    ts, values = ring.latest(ring.count)
+    # count changes of value, a stand-in for distinct conversions
+    return 1 + int(np.count_nonzero(np.diff(values[:, 0])))
+
+for sampler in (INA260Sampler(ina), AlertSampler(ina, GPIO, ALERT_PIN)):
+    if not REAL_BUS:
+        i2c_bus.reset_counts()
+    sampler.start()
+    time.sleep(1.0)
+    sampler.stop()
+    ring = sampler.ring
+    ts, values = ring.latest(ring.count)
+    print(type(sampler).__name__)
+    print("  samples", ring.count, "distinct", distinct(ring),
+          "mean", round(float(values[:, 0].mean() * CURRENT_LSB), 1), "mA")
+    if len(ts) > 1:
+        print("  mean interval", round(1e3 * float(np.diff(ts).mean()), 3), "ms")
+    if not REAL_BUS:
+        print("  bus transactions", i2c_bus.transactions)
+
+GPIO.cleanup()
@@ -0,0 +1,39 @@
+# INA260 configured for what we need instead of the 0x6127 default:
+# current only, at least 200 samples/s, at most 1.5 mA rms noise;
+# the sampler is then paced to the chip's own conversion period, so
+# every sample is a new conversion and none is read twice
+
+# runs on the fake bus unless REAL_BUS is set
+
+import time
+
+import numpy as np
+
+from ina260 import INA260, CURRENT_LSB
+from ina260_planner import plan_sampling
+from ina260_sampler import INA260Sampler
+
+REAL_BUS = False
+
+if REAL_BUS:
+    import smbus
+    i2c_bus = smbus.SMBus(1) # Create a new I2C bus
+else:
+    from fake_smbus import FakeSMBus, FakeINA260
+    i2c_bus = FakeSMBus([FakeINA260(0x45, current_fn=lambda t: 300.0 + 50.0 * np.sin(np.pi * t))])
+
+ina = INA260(i2c_bus)
+print("default period", round(1e3 * ina.conversion_period(), 3), "ms")
+plan = plan_sampling(rate=200, noise_ma=1.5)
+print(plan)
+period = ina.configure(plan.config)
+print("configured period", round(1e3 * period, 3), "ms")
+
+sampler = INA260Sampler(ina, period=period).start()
+time.sleep(1.0)
+sampler.stop()
+ts, values = sampler.ring.latest(sampler.ring.count)
+print("samples", len(ts), "expected about", int(1.0 / period))
+print("mean interval", round(1e3 * float(np.diff(ts).mean()), 3), "ms")
+print("current mean", round(float(values[:, 0].mean() * CURRENT_LSB), 1), "mA")
+ina.reset() # back to 0x6127
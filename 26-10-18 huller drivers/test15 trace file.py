@@ -0,0 +1,57 @@
+# servo sweep with the commanded positions and the INA260 current logged
+# to a binary trace file instead of printed, then the file read back
+# servo on channel 0
+
+# runs on the fake bus unless REAL_BUS is set
+
+import os, tempfile, time
+
+from pca9685 import PCA9685
+from ina260 import INA260
+from ina260_decode import current_ma
+from ina260_sampler import INA260Sampler
+from trace_file import TraceWriter, open_trace, TRACE_CURRENT, TRACE_PWM
+
+REAL_BUS = False
+TRACE_PATH = os.path.join(tempfile.gettempdir(), "servo_current.trace")
+
+if REAL_BUS:
+    import smbus
+    i2c_bus = smbus.SMBus(1) # Create a new I2C bus
+else:
+    from fake_smbus import FakeSMBus, FakePCA9685, FakeINA260
+    i2c_bus = FakeSMBus([FakePCA9685(0x40),
+                         FakeINA260(0x45, current_fn=lambda t: 250.0)])
+
+pwm = PCA9685(i2c_bus)
+pwm.begin(0x7C)
+sampler = INA260Sampler(INA260(i2c_bus), period=0.001).start()
+seq = 0
+
+# TraceWriter appends to a file that is already there, start afresh
+if os.path.exists(TRACE_PATH):
+    os.remove(TRACE_PATH)
+
+with TraceWriter(TRACE_PATH) as trace:
+    for time_high in list(range(103, 483, 4)) + list(range(483, 103, -4)):
+        pwm.set_pwm(0, 0, time_high)
+        trace.append(time.monotonic(), TRACE_PWM + 0, time_high)
+        # move what the sampler has collected since last time over
+        seq, pieces = sampler.ring.since(seq)
+        for ts, values in pieces:
+            trace.extend(ts, TRACE_CURRENT, values[:, 0])
+        time.sleep(0.01)
+    sampler.stop()
+    seq, pieces = sampler.ring.since(seq)
+    for ts, values in pieces:
+        trace.extend(ts, TRACE_CURRENT, values[:, 0])
+
+t0 = time.perf_counter()
+records = open_trace(TRACE_PATH).records
+print("records", len(records), "loaded in", round(1e3 * (time.perf_counter() - t0), 2), "ms")
+current = records[records["channel"] == TRACE_CURRENT]
+commands = records[records["channel"] == TRACE_PWM + 0]
+print("current samples", len(current), "mean",
+      round(float(current_ma(current["value"], swapped=True).mean()), 1), "mA")
+print("servo commands", len(commands), "from", commands["value"].min(),
+      "to", commands["value"].max())
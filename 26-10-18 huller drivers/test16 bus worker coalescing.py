@@ -0,0 +1,43 @@
+# the bus worker folding servo positions together
+# a producer commands positions far faster than the bus can carry them;
+# with coalesce set, positions still queued are replaced by newer ones,
+# one write per channel per 20 ms frame, and the chip ends on the last
+# position commanded
+
+# runs on the fake bus unless REAL_BUS is set; the fake bus is slowed to
+# 2 ms a transaction so the queue backs up
+
+import time
+from bus_worker import BusWorker, PRIORITY_HIGH, is_channel_register
+from pca9685 import PCA9685
+
+REAL_BUS = False
+
+if REAL_BUS:
+    import smbus
+    i2c_bus = smbus.SMBus(1) # Create a new I2C bus
+else:
+    from fake_smbus import FakeSMBus, FakePCA9685
+    chip = FakePCA9685(0x40)
+    i2c_bus = FakeSMBus([chip], latency=0.002)
+
+worker = BusWorker(i2c_bus, frame_period=0.02).start()
+pwm = PCA9685(worker.proxy(PRIORITY_HIGH, coalesce=is_channel_register))
+pwm.begin(0x7C)
+
+positions = list(range(103, 483)) + list(range(483, 103, -1))
+start = time.monotonic()
+for time_high in positions:
+    pwm.set_pwm(0, 0, time_high)
+    pwm.set_pwm(1, 0, 586 - time_high)
+    time.sleep(0.0005)
+print("commanded", 2 * len(positions), "positions in",
+      round(time.monotonic() - start, 3), "s")
+worker.stop()
+print("transactions", worker.executed, "coalesced", worker.coalesced)
+
+if not REAL_BUS:
+    last = positions[-1]
+    print("chip channel 0", chip.channel(0), "channel 1", chip.channel(1))
+    assert chip.channel(0) == (0, last) and chip.channel(1) == (0, 586 - last)
+    assert worker.coalesced > 0
@@ -0,0 +1,166 @@
+# binary trace files for current and command logs
+# servo_current.py and the INA260 tests only print; a multi-hour run at
+# kHz rates can't be kept that way, and text is slow to write and slower
+# to load. A trace is a small header and then fixed 12 byte records:
+#   t        float64, time.monotonic() seconds
+#   channel  uint16, what the value is (see the TRACE_ constants)
+#   value    int16, raw: INA260 register value, PWM counts, ...
+# written append-only through a memory map that grows in chunks, and read
+# back as a NumPy structured array mapped straight onto the file
+
+# usage:
+#   with TraceWriter("run.trace") as trace:
+#       trace.append(time.monotonic(), TRACE_PWM + 0, 300)
+#       trace.extend(ts, TRACE_CURRENT, values[:, 0])
+#   records = open_trace("run.trace").records
+#   current = records[records["channel"] == TRACE_CURRENT]
+
+# the header keeps the record count, brought up to date by flush() and
+# close(); after a crash, records since the last flush are lost, but the
+# file still opens, and appending carries on after the last counted one
+
+import os, struct, time
+
+import numpy as np
+
+MAGIC = b"HULTRACE"
+VERSION = 1
+HEADER_SIZE = 64
+# magic, version, record size, wall clock and monotonic time at
+# creation, record count; the rest is zero
+_HEADER = struct.Struct("<8sHH4xddQ")
+
+RECORD = np.dtype([("t", "<f8"), ("channel", "<u2"), ("value", "<i2")])
+
+# channel numbers
+TRACE_CURRENT = 0 # INA260 register values, as the sampler columns
+TRACE_BUS_VOLTAGE = 1
+TRACE_POWER = 2
+TRACE_PWM = 0x100 # + PCA9685 channel, OFF counts commanded
+
+
+class TraceWriter(object):
+    """Append-only writer; a new file, or more records on an old one."""
+
+    def __init__(self, path, chunk=65536):
+        self.path = path
+        self.chunk = chunk # records to grow the file by
+        new = not os.path.exists(path) or os.path.getsize(path) == 0
+        self._file = open(path, "w+b" if new else "r+b")
+        if new:
+            self.wall_t0, self.mono_t0 = time.time(), time.monotonic()
+            self.count = 0
+            self._write_header()
+        else:
+            info = _read_header(self._file)
+            self.wall_t0, self.mono_t0 = info["wall_t0"], info["mono_t0"]
+            self.count = info["count"]
+        self._records = None
+        self._map(max(self.count, 1))
+
+    def _write_header(self):
+        self._file.seek(0)
+        self._file.write(_HEADER.pack(MAGIC, VERSION, RECORD.itemsize,
+                                      self.wall_t0, self.mono_t0, self.count)
+                         .ljust(HEADER_SIZE, b"\0"))
+        self._file.flush()
+
+    def _map(self, needed):
+        """Map room for at least needed records, a chunk at a time."""
+        capacity = -(-needed // self.chunk) * self.chunk
+        if self._records is not None:
+            self._records.flush()
+            self._records = None
+        self._file.truncate(HEADER_SIZE + capacity * RECORD.itemsize)
+        self._records = np.memmap(self._file, dtype=RECORD, mode="r+",
+                                  offset=HEADER_SIZE, shape=(capacity,))
+
+    def append(self, t, channel, value):
+        if self.count >= len(self._records):
+            self._map(self.count + 1)
+        self._records[self.count] = (t, channel, value)
+        self.count += 1
+
+    def extend(self, t, channel, values):
+        """Many records at once; t and values arrays of the same length,
+        channel one number or an array.
+        """
+        n = len(values)
+        if self.count + n > len(self._records):
+            self._map(self.count + n)
+        rec = self._records[self.count:self.count + n]
+        rec["t"] = t
+        rec["channel"] = channel
+        rec["value"] = values
+        self.count += n
+
+    def flush(self):
+        """Records to the file, and the count in the header."""
+        self._records.flush()
+        self._write_header()
+
+    def close(self):
+        if self._file.closed:
+            return
+        self.flush()
+        self._records = None
+        # drop the unused end of the last chunk
+        self._file.truncate(HEADER_SIZE + self.count * RECORD.itemsize)
+        self._file.close()
+
+    def __enter__(self):
+        return self
+
+    def __exit__(self, *exc):
+        self.close()
+
+
+def _read_header(f):
+    f.seek(0)
+    raw = f.read(HEADER_SIZE)
+    if len(raw) < _HEADER.size:
+        raise ValueError("not a trace file, too short")
+    magic, version, size, wall_t0, mono_t0, count = _HEADER.unpack_from(raw)
+    if magic != MAGIC:
+        raise ValueError("not a trace file")
+    if version != VERSION or size != RECORD.itemsize:
+        raise ValueError("trace version {0}, record size {1} not supported".format(
+            version, size))
+    return {"version": version, "wall_t0": wall_t0, "mono_t0": mono_t0,
+            "count": count}
+
+
+class Trace(object):
+    """A trace file opened for reading; records is a read-only NumPy
+    structured array mapped onto the file, nothing is copied.
+    """
+
+    def __init__(self, path):
+        with open(path, "rb") as f:
+            info = _read_header(f)
+            size = os.fstat(f.fileno()).st_size
+        self.path = path
+        self.wall_t0 = info["wall_t0"]
+        self.mono_t0 = info["mono_t0"]
+        # a file still being written may hold more than the count says
+        self.count = min(info["count"], (size - HEADER_SIZE) // RECORD.itemsize)
+        if self.count:
+            self.records = np.memmap(path, dtype=RECORD, mode="r",
+                                     offset=HEADER_SIZE, shape=(self.count,))
+        else:
+            self.records = np.zeros(0, dtype=RECORD)
+
+    def __len__(self):
+        return self.count
+
+    def channel(self, channel):
+        """(t, value) arrays of one channel's records."""
+        r = self.records[self.records["channel"] == channel]
+        return r["t"], r["value"]
+
+    def wall_time(self, t):
+        """Wall clock time for monotonic times t from this trace."""
+        return self.wall_t0 + (t - self.mono_t0)
+
+def open_trace(path):
+    return Trace(path)
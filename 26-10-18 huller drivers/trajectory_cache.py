@@ -0,0 +1,113 @@
+# cache of precomputed servo trajectories
+# the huller repeats the same few moves (103 -> 483 and back for the
+# HXT900) thousands of times a shift, so each move is worked out once:
+# the pulse counts as a compact array('H'), and the four register bytes
+# per frame (ON_L, ON_H, OFF_L, OFF_H) ready to go on the bus
+# playback is then a copy of cached bytes per frame, no arithmetic
+
+# usage:
+#   cache = TrajectoryCache()
+#   up = cache.get("HXT900", 103, 483, SCURVE, 50.0, 2000, 20000)
+#   play_cached(pwm, 0, up, frame_period)
+# next to a FrameBuffer, whose channels are staggered, the move is cached
+# at the channel's ON offset:
+#   up = cache.get("HXT900", 103, 483, SCURVE, 50.0, 2000, 20000,
+#                  on=frame.offsets[3])
+#   play_cached(pwm, 3, up, frame_period, frame)
+
+from array import array
+from collections import OrderedDict
+import time
+
+import numpy as np
+
+from motion_profile import profile, TRAPEZOID
+from pca9685 import CHAN_BASE_ADDR_ON_L, MAX_HIGH
+
+
+class Trajectory(object):
+    """One cached move: pulse counts and the register payload per frame."""
+
+    __slots__ = ("positions", "payload", "on")
+
+    def __init__(self, positions, on=0):
+        p = np.asarray(positions, dtype=np.uint16)
+        self.positions = array("H", p.tobytes())
+        self.on = on
+        off = (on + p.astype(np.int32)) % (MAX_HIGH + 1)
+        regs = np.empty((len(p), 4), dtype=np.uint8)
+        regs[:, 0] = on & 0xFF
+        regs[:, 1] = on >> 8
+        regs[:, 2] = off & 0xFF
+        regs[:, 3] = off >> 8
+        self.payload = regs.tobytes()
+
+    def __len__(self):
+        return len(self.positions)
+
+    def frames(self):
+        """The 4-byte register payload of each frame, as memoryviews."""
+        mv = memoryview(self.payload)
+        return [mv[i:i + 4] for i in range(0, len(mv), 4)]
+
+
+class TrajectoryCache(object):
+    """Bounded LRU cache of Trajectory, keyed by move parameters."""
+
+    def __init__(self, maxsize=32):
+        self.maxsize = maxsize
+        self._entries = OrderedDict()
+        self.hits = 0
+        self.misses = 0
+
+    def get(self, model, start, end, kind=TRAPEZOID, frame_rate=50.0,
+            vmax=2000, amax=20000, on=0):
+        """Cached trajectory for a move, computing it on first use.
+
+        model is the servo model name, so two servo types doing the same
+        counts with different limits don't share an entry; on is the
+        channel's ON offset, see FrameBuffer.stagger.
+        """
+        key = (model, start, end, kind, frame_rate, vmax, amax, on)
+        traj = self._entries.get(key)
+        if traj is not None:
+            self._entries.move_to_end(key)
+            self.hits += 1
+            return traj
+        self.misses += 1
+        traj = Trajectory(profile(start, end, vmax, amax, frame_rate, kind), on)
+        self._entries[key] = traj
+        if len(self._entries) > self.maxsize:
+            self._entries.popitem(last=False) # least recently used
+        return traj
+
+    def __len__(self):
+        return len(self._entries)
+
+    def clear(self):
+        self._entries.clear()
+
+
+def play_cached(pwm, channel, traj, frame_period, frame=None,
+                sleep=time.sleep):
+    """Send a cached trajectory, one 4-byte block write per PWM frame.
+
+    If the channel is also driven through a FrameBuffer, pass it so its
+    image is left matching the last position sent; the trajectory must
+    then be cached at the channel's ON offset, ValueError if not.
+    """
+    if frame is not None and traj.on != frame.offsets[channel]:
+        raise ValueError("trajectory has ON {0}, channel {1} is at {2}; get it "
+                         "with on=frame.offsets[{1}]".format(
+                             traj.on, channel, frame.offsets[channel]))
+    register = CHAN_BASE_ADDR_ON_L + 4 * channel
+    frames = traj.frames()
+    deadline = time.monotonic()
+    for data in frames:
+        pwm.write_regs(register, data)
+        deadline += frame_period
+        delay = deadline - time.monotonic()
+        if delay > 0:
+            sleep(delay)
+    if frame is not None and frames:
+        frame.assume_channel(channel, frames[-1])